@@ -0,0 +1,13 @@
+import tempfile
+
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def temporary_cache(django_test_environment):
+    """Кэш pytest во временном файле, как у core.test_runner.TestRunner."""
+    from core.test_runner import temporary_caches
+
+    with tempfile.TemporaryDirectory() as directory:
+        with temporary_caches(directory):
+            yield
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        if settings.TEMPLATE_PRECOMPILE:
+            from django.template import engines
+            for engine in engines.all():
+                if hasattr(engine, 'precompile'):
+                    engine.precompile()
@@ -0,0 +1,215 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT NOT NULL UNIQUE,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+"""
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite в режиме WAL, общий для всех процессов хоста.
+
+    В отличие от LocMemCache, воркеры видят одни и те же записи, поэтому
+    инвалидация в одном процессе доходит до всех. Размер файла
+    ограничен OPTIONS['MAX_SIZE'] (в байтах): при переполнении
+    вытесняются давно не читавшиеся записи (LRU с точностью до
+    OPTIONS['TOUCH_INTERVAL'] секунд, чтобы чтение не превращалось
+    в запись на каждый get).
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = options.get('MAX_SIZE', 256 * 1024 * 1024)
+        self._touch_interval = options.get('TOUCH_INTERVAL', 60)
+        self._mmap_size = options.get('MMAP_SIZE', self._max_size)
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        # Соединение на поток и на процесс: после fork соединение
+        # родителя использовать нельзя.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA mmap_size={int(self._mmap_size)}')
+            connection.executescript(SCHEMA)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dump(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _fetch(self, keys):
+        """Живые записи по ключам; заодно отмечает чтение для LRU."""
+        with metrics.timer('cache'):
+            found = self._select(keys)
+        metrics.count_cache(len(found), len(keys) - len(found))
+        return found
+
+    def _select(self, keys):
+        now = time.time()
+        placeholders = ','.join('?' * len(keys))
+        rows = self._connection.execute(
+            f'SELECT key, value, accessed FROM cache '
+            f'WHERE key IN ({placeholders}) '
+            f'AND (expires IS NULL OR expires > ?)',
+            [*keys, now],
+        ).fetchall()
+        stale = [key for key, _, accessed in rows
+                 if now - accessed > self._touch_interval]
+        if stale:
+            placeholders = ','.join('?' * len(stale))
+            self._connection.execute(
+                f'UPDATE cache SET accessed = ? '
+                f'WHERE key IN ({placeholders})', [now, *stale])
+        return {key: pickle.loads(value) for key, value, _ in rows}
+
+    def _write(self, items, timeout, replace=True):
+        with metrics.timer('cache'):
+            return self._insert(items, timeout, replace)
+
+    def _insert(self, items, timeout, replace):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        # Сериализуем до блокировки, чтобы не держать ее лишнее время.
+        items = [(key, self._dump(value)) for key, value in items]
+        conflict = 'REPLACE' if replace else 'IGNORE'
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            written = 0
+            for key, value in items:
+                if not replace:
+                    # Просроченная запись не мешает add().
+                    connection.execute(
+                        'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                        (key, now))
+                written += connection.execute(
+                    f'INSERT OR {conflict} INTO cache '
+                    f'(key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                    (key, value, expires, now),
+                ).rowcount
+            self._evict(connection)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return written
+
+    def _evict(self, connection):
+        """Держит размер базы в пределах MAX_SIZE."""
+        page_size, = connection.execute('PRAGMA page_size').fetchone()
+        pages, = connection.execute('PRAGMA page_count').fetchone()
+        free, = connection.execute('PRAGMA freelist_count').fetchone()
+        if (pages - free) * page_size <= self._max_size:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        rows, = connection.execute('SELECT COUNT(*) FROM cache').fetchone()
+        # Как и другие бэкенды Django, вытесняем 1/CULL_FREQUENCY записей.
+        connection.execute(
+            'DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache '
+            'ORDER BY accessed LIMIT ?)',
+            (max(1, rows // self._cull_frequency),))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._write([(key, value)], timeout, replace=False))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        found = self._fetch(list(keys))
+        return {keys[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write([(self._key(key, version), value)], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write([(self._key(key, version), value)
+                     for key, value in data.items()], timeout)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        ).rowcount)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: чтение и запись в одной
+        транзакции с блокировкой на запись."""
+        key = self._key(key, version)
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (self._dump(value), key))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return value
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            placeholders = ','.join('?' * len(keys))
+            self._connection.execute(
+                f'DELETE FROM cache WHERE key IN ({placeholders})', keys)
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
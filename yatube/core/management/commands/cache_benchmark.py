@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'filebased': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.SQLiteCache',
+}
+
+
+def create_cache(name, directory):
+    location = {
+        'locmem': 'benchmark',
+        'filebased': os.path.join(directory, 'filebased'),
+        'sqlite': os.path.join(directory, 'cache.sqlite3'),
+    }[name]
+    return import_string(BACKENDS[name])(location, {
+        'TIMEOUT': None, 'OPTIONS': {'MAX_ENTRIES': 10 ** 6},
+    })
+
+
+def measure(function, count):
+    started = time.perf_counter()
+    function()
+    return count / (time.perf_counter() - started)
+
+
+def micro(name, directory, keys, value):
+    """Пропускная способность отдельных операций в одном процессе."""
+    cache = create_cache(name, directory)
+    cache.clear()
+    names = [f'key:{number}' for number in range(keys)]
+    results = {
+        'set': measure(lambda: [cache.set(key, value) for key in names],
+                       keys),
+        'get': measure(lambda: [cache.get(key) for key in names], keys),
+        'get_many': measure(lambda: [
+            cache.get_many(names[start:start + 10])
+            for start in range(0, keys, 10)], keys),
+    }
+    cache.set('counter', 0)
+    results['incr'] = measure(
+        lambda: [cache.incr('counter') for _ in names], keys)
+    cache.clear()
+    return results
+
+
+def worker(name, directory, keys, operations, value, seed):
+    """Кэш «читай, а при промахе запиши» на общем наборе ключей, как
+    у воркеров WSGI; возвращает (операции, попадания, секунды)."""
+    cache = create_cache(name, directory)
+    chooser = random.Random(seed)
+    hits = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        key = f'shared:{chooser.randrange(keys)}'
+        if cache.get(key) is None:
+            cache.set(key, value)
+        else:
+            hits += 1
+    return operations, hits, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает бэкенды кэша (LocMemCache, FileBasedCache, '
+            'SQLiteCache): скорость операций и долю попаданий, когда '
+            'кэш читают несколько процессов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', action='append', choices=sorted(BACKENDS),
+            help='Какие бэкенды мерить; по умолчанию все.',
+        )
+        parser.add_argument(
+            '--keys', type=int, default=2000,
+            help='Число разных ключей.',
+        )
+        parser.add_argument(
+            '--value-size', type=int, default=4096,
+            help='Размер значения в байтах.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=4,
+            help='Сколько процессов читают общий кэш.',
+        )
+        parser.add_argument(
+            '--operations', type=int, default=5000,
+            help='Операций на процесс в многопроцессном тесте.',
+        )
+
+    def handle(self, *args, **options):
+        value = os.urandom(options['value_size'])
+        context = multiprocessing.get_context('spawn')
+        for name in options['backend'] or sorted(BACKENDS):
+            directory = tempfile.mkdtemp()
+            try:
+                results = micro(name, directory, options['keys'], value)
+                self.stdout.write(f'{name}: ' + ', '.join(
+                    f'{operation} {rate:,.0f}/с'
+                    for operation, rate in results.items()))
+                with ProcessPoolExecutor(
+                    max_workers=options['processes'],
+                    mp_context=context,
+                    initializer=django.setup,
+                ) as executor:
+                    futures = [
+                        executor.submit(
+                            worker, name, directory, options['keys'],
+                            options['operations'], value, seed)
+                        for seed in range(options['processes'])
+                    ]
+                    totals = [future.result() for future in futures]
+                operations = sum(total for total, _, _ in totals)
+                hits = sum(hits for _, hits, _ in totals)
+                elapsed = max(seconds for _, _, seconds in totals)
+                self.stdout.write(
+                    f'{name}, процессов {options["processes"]}: '
+                    f'{operations / elapsed:,.0f} операций/с, '
+                    f'попаданий {hits / operations:.0%}')
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,206 @@
+"""Замеры запросов: Server-Timing и гистограммы для Prometheus.
+
+Счетчики текущего запроса лежат в contextvar, и функции модуля вне
+запроса ничего не делают. Итоги запросов копятся в памяти процесса
+и раз в METRICS_FLUSH_INTERVAL секунд сбрасываются в общий кэш, чтобы
+/metrics/ показывал сумму по всем воркерам.
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+# границы корзин гистограммы времени запроса, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# составляющие времени запроса под их именами в Server-Timing
+COMPONENTS = ('db', 'tpl', 'cache', 'thumb')
+WORKERS_KEY = 'metrics:workers'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_lock = threading.Lock()
+_views = {}
+_flushed = time.monotonic()
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'seconds', 'counts', 'active',
+                 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = dict.fromkeys(COMPONENTS, 0.0)
+        self.counts = dict.fromkeys(COMPONENTS, 0)
+        self.active = set()
+        self.cache_hits = self.cache_misses = 0
+
+    def server_timing(self, total):
+        """Значение заголовка Server-Timing: миллисекунды составляющих
+        и всего запроса."""
+        descriptions = {
+            'db': f'{self.counts["db"]} queries',
+            'cache': f'{self.cache_hits} hits, {self.cache_misses} misses',
+        }
+        parts = []
+        for name in COMPONENTS:
+            if self.counts[name]:
+                part = f'{name};dur={self.seconds[name] * 1000:.1f}'
+                if name in descriptions:
+                    part += f';desc="{descriptions[name]}"'
+                parts.append(part)
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+@contextmanager
+def timer(name):
+    """Прибавляет время блока к составляющей name текущего запроса.
+
+    Вложенные блоки той же составляющей не считаются дважды: шаблон,
+    отрисованный внутри шаблона, — это время внешнего.
+    """
+    current = _current.get()
+    if current is None or name in current.active:
+        yield
+        return
+    current.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.seconds[name] += time.perf_counter() - started
+        current.counts[name] += 1
+        current.active.discard(name)
+
+
+def count_cache(hits, misses):
+    current = _current.get()
+    if current is not None:
+        current.cache_hits += hits
+        current.cache_misses += misses
+
+
+def _record_query(execute, sql, params, many, context):
+    with timer('db'):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def measure():
+    """Замеряет запрос: выдает RequestMetrics, которые копятся внутри
+    блока, и следит за всеми соединениями с базой."""
+    current = RequestMetrics()
+    token = _current.set(current)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(_record_query))
+            yield current
+    finally:
+        _current.reset(token)
+
+
+def _empty():
+    return {
+        'buckets': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0,
+        'queries': 0, 'cache_hits': 0, 'cache_misses': 0,
+        **{f'{name}_seconds': 0.0 for name in COMPONENTS},
+    }
+
+
+def observe(view, current, total):
+    """Добавляет итоги запроса к статистике представления view."""
+    global _flushed
+    with _lock:
+        stats = _views.get(view)
+        if stats is None:
+            stats = _views[view] = _empty()
+        for index, bound in enumerate(BUCKETS):
+            if total <= bound:
+                stats['buckets'][index] += 1
+        stats['count'] += 1
+        stats['sum'] += total
+        stats['queries'] += current.counts['db']
+        stats['cache_hits'] += current.cache_hits
+        stats['cache_misses'] += current.cache_misses
+        for name in COMPONENTS:
+            stats[f'{name}_seconds'] += current.seconds[name]
+        now = time.monotonic()
+        if now - _flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        _flushed = now
+    flush()
+
+
+def flush():
+    """Кладет статистику процесса в общий кэш под ключом воркера."""
+    with _lock:
+        snapshot = {view: {**stats, 'buckets': list(stats['buckets'])}
+                    for view, stats in _views.items()}
+    worker = f'{os.uname().nodename}:{os.getpid()}'
+    cache.set(f'metrics:{worker}', snapshot, None)
+    # Гонка двух воркеров может потерять одного из них, но каждый
+    # добавляет себя при каждом сбросе.
+    workers = cache.get(WORKERS_KEY) or []
+    if worker not in workers:
+        cache.set(WORKERS_KEY, [*workers, worker], None)
+
+
+def collect():
+    """Статистика всех воркеров, сложенная по представлениям."""
+    flush()
+    workers = cache.get(WORKERS_KEY) or []
+    snapshots = cache.get_many([f'metrics:{worker}' for worker in workers])
+    # Воркеры, чьи записи вытеснены из кэша, забываем.
+    alive = [worker for worker in workers
+             if f'metrics:{worker}' in snapshots]
+    if alive != workers:
+        cache.set(WORKERS_KEY, alive, None)
+    total = {}
+    for snapshot in snapshots.values():
+        for view, stats in snapshot.items():
+            merged = total.setdefault(view, _empty())
+            for key, value in stats.items():
+                if key == 'buckets':
+                    merged[key] = [
+                        mine + theirs
+                        for mine, theirs in zip(merged[key], value)]
+                else:
+                    merged[key] += value
+    return total
+
+
+def render(views):
+    """Текстовый формат экспозиции Prometheus."""
+    name = 'yatube_request_duration_seconds'
+    lines = [
+        f'# HELP {name} Request duration by view.',
+        f'# TYPE {name} histogram',
+    ]
+    for view, stats in sorted(views.items()):
+        label = f'view="{view}"'
+        for bound, count in zip(BUCKETS, stats['buckets']):
+            lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {stats["count"]}')
+        lines.append(f'{name}_sum{{{label}}} {stats["sum"]:.6f}')
+        lines.append(f'{name}_count{{{label}}} {stats["count"]}')
+    counters = [
+        ('yatube_db_queries_total', 'queries', 'Database queries.'),
+        ('yatube_cache_hits_total', 'cache_hits', 'Cache hits.'),
+        ('yatube_cache_misses_total', 'cache_misses', 'Cache misses.'),
+    ] + [
+        (f'yatube_{component}_seconds_total', f'{component}_seconds',
+         f'Time spent in {component}.')
+        for component in COMPONENTS
+    ]
+    for metric, key, help_text in counters:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for view, stats in sorted(views.items()):
+            lines.append(f'{metric}{{view="{view}"}} {stats[key]}')
+    return '\n'.join(lines) + '\n'
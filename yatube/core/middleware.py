@@ -0,0 +1,27 @@
+import time
+
+from . import metrics
+
+
+class MetricsMiddleware:
+    """Замеряет каждый запрос: число запросов к базе и их время, время
+    шаблонов, кэша и миниатюр.
+
+    Итоги уходят в заголовок Server-Timing и в гистограммы по
+    представлениям для /metrics/. Стоит первым в MIDDLEWARE, чтобы
+    видеть время остальных. Время отдачи потоковых ответов не
+    учитывается: к выходу из middleware они еще не прочитаны.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with metrics.measure() as current:
+            response = self.get_response(request)
+        total = time.perf_counter() - current.started
+        response['Server-Timing'] = current.server_timing(total)
+        match = request.resolver_match
+        metrics.observe(match.view_name if match else '<unmatched>',
+                        current, total)
+        return response
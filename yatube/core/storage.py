@@ -0,0 +1,40 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, в котором имя файла — sha256 его содержимого.
+
+    Одинаковые загрузки получают одно и то же имя и делят один файл
+    (и, как следствие, один набор миниатюр sorl).
+    """
+    chunk_size = 64 * 1024
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(self.chunk_size):
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            os.path.dirname(name), digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Обновляем mtime: ни sweep_media, ни освобождение картинки
+            # удаленного поста не трогают свежие файлы, а на этот файл
+            # только что появилась новая ссылка.
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                # Файл удалили между проверкой и utime: пишем заново.
+                pass
+        return super()._save(name, content)
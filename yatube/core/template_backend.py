@@ -0,0 +1,109 @@
+import os
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.backends import django as django_backend
+from django.template.loader_tags import ExtendsNode, IncludeNode
+
+from . import metrics
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with metrics.timer('tpl'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Стандартный бэкенд шаблонов, который замеряет время отрисовки
+    для Server-Timing.
+
+    С TEMPLATE_PRECOMPILE шаблоны грузятся через кэширующий загрузчик,
+    а precompile() заранее компилирует их все.
+    """
+
+    def __init__(self, params):
+        params = params.copy()
+        options = params.get('OPTIONS', {}).copy()
+        if settings.TEMPLATE_PRECOMPILE and 'loaders' not in options:
+            loaders = ['django.template.loaders.filesystem.Loader']
+            if params.get('APP_DIRS'):
+                loaders.append(
+                    'django.template.loaders.app_directories.Loader')
+            options['loaders'] = [(CACHED_LOADER, loaders)]
+            params['APP_DIRS'] = False
+        params['OPTIONS'] = options
+        super().__init__(params)
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+    def template_names(self):
+        """Имена всех шаблонов в каталогах загрузчиков; при совпадении
+        имен, как и при загрузке, побеждает первый каталог."""
+        names = {}
+        for loader in self.engine.template_loaders:
+            for inner in getattr(loader, 'loaders', [loader]):
+                for directory in inner.get_dirs():
+                    for name in walk(directory):
+                        names.setdefault(name, directory)
+        return names
+
+    def precompile(self):
+        """Компилирует все шаблоны в кэш загрузчика и возвращает их
+        число.
+
+        Для шаблонов из DIRS проверяет, что {% extends %} и
+        {% include %} с постоянными именами ссылаются на существующие
+        шаблоны: ошибку лучше увидеть при старте, чем на первом запросе
+        к редкой странице. Шаблоны приложений не проверяются: виджеты
+        админки, например, подключают шаблоны движка форм.
+        """
+        names = self.template_names()
+        for name, directory in names.items():
+            try:
+                template = self.engine.get_template(name)
+            except TemplateSyntaxError as exc:
+                raise ImproperlyConfigured(
+                    f'Шаблон {name} не компилируется: {exc}') from exc
+            except UnicodeDecodeError:
+                # Не текст: картинка или другой файл рядом с шаблонами.
+                continue
+            if directory not in self.engine.dirs:
+                continue
+            for target in referenced(template):
+                try:
+                    self.engine.get_template(target)
+                except TemplateDoesNotExist as exc:
+                    raise ImproperlyConfigured(
+                        f'Шаблон {name} ссылается на несуществующий '
+                        f'{target}.') from exc
+        return len(names)
+
+
+def walk(directory):
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            name = os.path.relpath(os.path.join(root, filename), directory)
+            yield name.replace(os.sep, '/')
+
+
+def referenced(template):
+    """Постоянные имена шаблонов из {% extends %} и {% include %};
+    имена из переменных известны только при отрисовке."""
+    nodes = (template.nodelist.get_nodes_by_type(ExtendsNode)
+             + template.nodelist.get_nodes_by_type(IncludeNode))
+    for node in nodes:
+        expression = (node.parent_name if isinstance(node, ExtendsNode)
+                      else node.template)
+        if isinstance(expression.var, str) and not expression.filters:
+            yield expression.var
@@ -0,0 +1,37 @@
+import copy
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def temporary_caches(directory):
+    """override_settings, который переносит файлы SQLiteCache в directory.
+
+    Файловый кэш переживает перезапуски и общий с dev-сервером:
+    без подмены тесты видели бы записи прошлых запусков.
+    """
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, params in caches.items():
+        if params['BACKEND'] == 'core.cache.SQLiteCache':
+            params['LOCATION'] = os.path.join(directory, f'{alias}.sqlite3')
+    return override_settings(CACHES=caches)
+
+
+class TestRunner(DiscoverRunner):
+    """Подменяет файлы SQLiteCache временными на время тестов
+    manage.py test; для pytest то же делает conftest.py в корне."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_settings = temporary_caches(self.cache_dir)
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.create_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def create_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        """get/set/add/delete/get_many ведут себя как у LocMemCache."""
+        cache = self.cache
+        cache.set('key', {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+        self.assertFalse(cache.add('key', 'other'))
+        self.assertTrue(cache.add('new', 'value'))
+        self.assertEqual(cache.get_many(['key', 'new', 'missing']),
+                         {'key': {'value': 1}, 'new': 'value'})
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get('key', 'default'), 'default')
+        cache.clear()
+        self.assertFalse(cache.has_key('new'))
+
+    def test_expired_entries_are_invisible(self):
+        """Просроченная запись не читается, а add() ее перезаписывает."""
+        with mock.patch('time.time', return_value=1000):
+            self.cache.set('key', 'old', timeout=10)
+        with mock.patch('time.time', return_value=1011):
+            self.assertIsNone(self.cache.get('key'))
+            self.assertTrue(self.cache.add('key', 'new'))
+            self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_shared_between_instances(self):
+        """Запись одного процесса видна другому: у них общий файл."""
+        self.cache.set('generation', 1)
+        other = self.create_cache()
+        self.assertEqual(other.incr('generation'), 2)
+        self.assertEqual(self.cache.get('generation'), 2)
+        with self.assertRaises(ValueError):
+            other.incr('missing')
+
+    def test_incr_is_atomic(self):
+        """Параллельные incr не теряют приращений."""
+        self.cache.set('counter', 0)
+
+        def increment():
+            cache = self.create_cache()
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_size_cap_evicts_least_recently_used(self):
+        """При переполнении вытесняются давно не читавшиеся записи."""
+        cache = self.create_cache(MAX_SIZE=256 * 1024, TOUCH_INTERVAL=0)
+        cache.set('hot', b'x' * 1024)
+        for number in range(400):
+            cache.set(f'cold:{number}', b'x' * 1024)
+            cache.get('hot')
+        self.assertEqual(cache.get('hot'), b'x' * 1024)
+        self.assertIsNone(cache.get('cold:0'))
+        self.assertLessEqual(os.path.getsize(self.location), 512 * 1024)
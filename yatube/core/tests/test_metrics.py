@@ -0,0 +1,101 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from posts.models import Post
+
+from core import metrics
+
+User = get_user_model()
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        metrics._views.clear()
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def timings(self, response):
+        return {
+            name: (float(duration), description)
+            for name, duration, description in re.findall(
+                r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?',
+                response['Server-Timing'])
+        }
+
+    def test_server_timing_header(self):
+        """Заголовок Server-Timing перечисляет составляющие запроса."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/')
+        timings = self.timings(response)
+        self.assertEqual(timings['db'][1], f'{len(queries)} queries')
+        self.assertIn('tpl', timings)
+        self.assertRegex(timings['cache'][1], r'^\d+ hits, \d+ misses$')
+        self.assertGreaterEqual(timings['total'][0], timings['tpl'][0])
+
+    def test_nested_timers_count_once(self):
+        """Вложенный замер той же составляющей не удваивает время."""
+        with metrics.measure() as current:
+            with metrics.timer('tpl'):
+                with metrics.timer('tpl'):
+                    pass
+            metrics.count_cache(2, 1)
+        self.assertEqual(current.counts['tpl'], 1)
+        self.assertEqual((current.cache_hits, current.cache_misses), (2, 1))
+        # Вне запроса замеры ничего не делают.
+        with metrics.timer('tpl'):
+            metrics.count_cache(1, 0)
+
+    def test_metrics_endpoint(self):
+        """/metrics/ отдает гистограммы по представлениям."""
+        self.client.get('/')
+        self.client.get('/')
+        body = self.client.get('/metrics/').content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      body)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            body)
+        self.assertRegex(
+            body, r'yatube_db_queries_total\{view="posts:index"\} \d+')
+
+    def test_metrics_endpoint_is_internal(self):
+        """С чужого адреса /metrics/ не виден."""
+        response = self.client.get('/metrics/', REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_token(self):
+        """С METRICS_TOKEN локального адреса мало: нужен токен."""
+        self.assertEqual(self.client.get('/metrics/').status_code, 404)
+        response = self.client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_workers_are_summed(self):
+        """Статистика других воркеров из общего кэша складывается."""
+        self.client.get('/')
+        other = metrics._empty()
+        other.update(count=3, sum=0.3, queries=9)
+        other['buckets'] = [3] * len(metrics.BUCKETS)
+        cache.set('metrics:other:1', {'posts:index': other}, None)
+        metrics.flush()
+        cache.set(metrics.WORKERS_KEY, [
+            *cache.get(metrics.WORKERS_KEY), 'other:1', 'gone:2'])
+        views = metrics.collect()
+        self.assertEqual(views['posts:index']['count'], 4)
+        self.assertNotIn('gone:2', cache.get(metrics.WORKERS_KEY))
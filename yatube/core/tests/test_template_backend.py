@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import SimpleTestCase, override_settings
+
+from core.template_backend import DjangoTemplates
+
+
+def create_backend(dirs=None, app_dirs=True, **options):
+    return DjangoTemplates({
+        'NAME': 'test',
+        'DIRS': dirs or settings.TEMPLATES[0]['DIRS'],
+        'APP_DIRS': app_dirs,
+        'OPTIONS': options,
+    })
+
+
+@override_settings(TEMPLATE_PRECOMPILE=True)
+class PrecompileTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(text)
+
+    def test_project_templates_are_cached(self):
+        """Все шаблоны проекта, включая подключаемые, компилируются
+        заранее в кэш загрузчика."""
+        backend = create_backend()
+        count = backend.precompile()
+        loader = backend.engine.template_loaders[0]
+        self.assertIsInstance(loader, CachedLoader)
+        self.assertEqual(len(loader.get_template_cache), count)
+        for name in ('base.html', 'includes/header.html',
+                     'posts/index.html', 'posts/comment.html',
+                     'posts/includes/paginator.html',
+                     'posts/includes/switcher.html'):
+            with self.subTest(name=name):
+                self.assertIn(name, loader.get_template_cache)
+
+    def test_missing_include(self):
+        """Ссылка на несуществующий шаблон останавливает старт."""
+        self.write('page.html', "{% if x %}{% include 'missing.html' %}"
+                                "{% endif %}")
+        backend = create_backend([self.directory], app_dirs=False)
+        with self.assertRaisesMessage(ImproperlyConfigured, 'missing.html'):
+            backend.precompile()
+
+    def test_missing_parent(self):
+        self.write('page.html', "{% extends 'missing.html' %}")
+        backend = create_backend([self.directory], app_dirs=False)
+        with self.assertRaisesMessage(ImproperlyConfigured, 'missing.html'):
+            backend.precompile()
+
+    def test_syntax_error(self):
+        self.write('includes/broken.html', '{% if %}')
+        backend = create_backend([self.directory], app_dirs=False)
+        with self.assertRaisesMessage(
+                ImproperlyConfigured, 'includes/broken.html'):
+            backend.precompile()
+
+    def test_variable_include_is_skipped(self):
+        """Имя из переменной известно только при отрисовке."""
+        self.write('page.html', '{% include name %}')
+        backend = create_backend([self.directory], app_dirs=False)
+        self.assertEqual(backend.precompile(), 1)
+
+    @override_settings(TEMPLATE_PRECOMPILE=False)
+    def test_disabled(self):
+        """Без TEMPLATE_PRECOMPILE при отладке шаблоны читаются
+        с диска."""
+        backend = create_backend(debug=True)
+        self.assertNotIsInstance(
+            backend.engine.template_loaders[0], CachedLoader)
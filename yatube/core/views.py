@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import collect, render as render_metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,23 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def metrics_allowed(request):
+    """Запрос с METRICS_IPS и, если задан METRICS_TOKEN, с этим токеном."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_IPS:
+        return False
+    if not settings.METRICS_TOKEN:
+        return True
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    return hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(),
+        expected.encode())
+
+
+def metrics(request):
+    """Статистика запросов в формате Prometheus; только для сборщика."""
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(render_metrics(collect()),
+                        content_type='text/plain; version=0.0.4')
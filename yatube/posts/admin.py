@@ -1,14 +1,92 @@
+import datetime
+
 from django.contrib import admin
+from django.db import models
+from django.utils import timezone
 
+from . import search
 from .models import Comment, Follow, Group, Post
+from .utils import EstimatedCountPaginator
+
+
+class DateProbeQuerySet(models.QuerySet):
+    """QuerySet для date_hierarchy.
+
+    dates() вместо SELECT DISTINCT по всей таблице перепрыгивает
+    от периода к периоду запросами LIMIT 1 по индексу поля: запросов
+    столько, сколько в списке периодов.
+    """
+
+    def dates(self, field_name, kind, order='ASC'):
+        if kind not in ('year', 'month', 'day'):
+            return super().dates(field_name, kind, order)
+        values = self.order_by(field_name).values_list(
+            field_name, flat=True)
+        periods = []
+        value = values.first()
+        while value is not None:
+            day = timezone.localtime(value).date()
+            if kind == 'year':
+                period = day.replace(month=1, day=1)
+                following = period.replace(year=period.year + 1)
+            elif kind == 'month':
+                period = day.replace(day=1)
+                following = (period + datetime.timedelta(days=31)).replace(
+                    day=1)
+            else:
+                period = following = day
+                following += datetime.timedelta(days=1)
+            periods.append(period)
+            start = timezone.make_aware(
+                datetime.datetime.combine(following, datetime.time.min))
+            value = values.filter(**{f'{field_name}__gte': start}).first()
+        return periods if order == 'ASC' else periods[::-1]
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
     list_editable = ('group',)
     search_fields = ('text',)
+    # Оба фильтра по дате — диапазоны по индексу post_date_idx.
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    # Без второго COUNT(*) по всей таблице для «показать все».
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateProbeQuerySet(
+            model=queryset.model, query=queryset.query, using=queryset.db)
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_dbfield(db_field, request, **kwargs)
+        if db_field.name == 'group' and formfield is not None:
+            # Список групп читается один раз на запрос, а не заново
+            # для <select> в каждой строке list_editable.
+            if not hasattr(request, 'post_admin_group_choices'):
+                request.post_admin_group_choices = list(formfield.choices)
+            formfield.choices = request.post_admin_group_choices
+            # Админка оборачивает <select> в RelatedFieldWidgetWrapper.
+            widget = getattr(formfield.widget, 'widget', formfield.widget)
+            widget.choices = formfield.choices
+        return formfield
+
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице ищем по индексу FTS5.
+        match = search.match_expression(search_term)
+        if match is None or not search.is_supported(queryset.db):
+            return super().get_search_results(
+                request, queryset, search_term)
+        # extra, а не RawSQL: тот оборачивает подзапрос во вторые
+        # скобки, и IN сравнивает только с первой строкой.
+        return queryset.extra(
+            where=['posts_post.id IN (SELECT rowid FROM posts_post_fts '
+                   'WHERE posts_post_fts MATCH %s)'],
+            params=[match],
+        ), False
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,180 @@
+"""JSON API лент для мобильных клиентов.
+
+Данные те же, что на HTML-страницах, но без шаблонов: строки берутся
+через values() и сериализуются по одной прямо в поток ответа. Страницы
+листаются курсором ?after=, их размер задает ?limit=. ETag зависит от
+поколения лент, поэтому повторный запрос с If-None-Match получает 304
+без запросов к лентам.
+"""
+from django.conf import settings
+from django.db.models import F, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_GET
+
+from . import follow_graph
+from .conditional import feed_etag, post_etag
+from .models import Comment, Group, Post, User
+from .stats import get_stats
+from .thumbnails import get_alias_thumbnail, prefetch_images
+from .utils import batched, beyond, decode_cursor, dumps, encode_cursor
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'author__username',
+    'author__first_name', 'author__last_name', 'group__slug', 'group__title',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+# столько строк за раз получают миниатюры одним запросом к кэшу
+THUMBNAIL_BATCH = 20
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.PAGE_QUANTITY))
+    except ValueError:
+        limit = settings.PAGE_QUANTITY
+    return min(max(limit, 1), settings.API_PAGE_LIMIT)
+
+
+def keyset(queryset, request, field, filters=None):
+    """Строки страницы по убыванию (field, id) и еще одна, по которой
+    видно, есть ли следующая страница.
+
+    Условия фильтра и курсора идут в один filter(): для связей
+    «многие» отдельные вызовы дали бы отдельные JOIN.
+    """
+    where = Q(**(filters or {}))
+    after = decode_cursor(request.GET.get('after'))
+    if after is not None:
+        where &= beyond(field, after)
+    return queryset.filter(where).order_by(f'-{field}', '-pk')
+
+
+def full_name(row, prefix='author__'):
+    return ' '.join(filter(None, (
+        row[f'{prefix}first_name'], row[f'{prefix}last_name'])))
+
+
+def serialize_posts(rows):
+    """Посты из строк values(): только то, что показывает карточка."""
+    field = Post._meta.get_field('image')
+    for chunk in batched(rows, THUMBNAIL_BATCH):
+        images = [field.attr_class(None, field, row['image'])
+                  for row in chunk]
+        prefetch_images([image for image in images if image])
+        for row, image in zip(chunk, images):
+            thumbnail = get_alias_thumbnail(image, 'card')
+            yield row, {
+                'id': row['id'],
+                'text': row['text'],
+                'pub_date': row['pub_date'],
+                'author': {
+                    'username': row['author__username'],
+                    'full_name': full_name(row),
+                },
+                'group': row['group__slug'] and {
+                    'slug': row['group__slug'],
+                    'title': row['group__title'],
+                },
+                'image': thumbnail.url if thumbnail else None,
+            }
+
+
+def serialize_comments(rows):
+    for row in rows:
+        yield row, {
+            'id': row['id'],
+            'text': row['text'],
+            'created': row['created'],
+            'author': {'username': row['author__username']},
+        }
+
+
+def stream(items, limit, head=None):
+    """Тело ответа {...head, "results": [...], "next": курсор} по
+    частям; items выдает пары (строка с полем cursor, объект)."""
+    yield '{'
+    for key, value in (head or {}).items():
+        yield f'{dumps(key)}: {dumps(value)}, '
+    yield '"results": ['
+    cursor = last = None
+    for number, (row, item) in enumerate(items):
+        if number == limit:
+            cursor = encode_cursor(last['cursor'], last['id'])
+            break
+        yield (', ' if number else '') + dumps(item)
+        last = row
+    yield f'], "next": {dumps(cursor)}}}'
+
+
+def feed_response(queryset, request, field='pub_date', filters=None,
+                  head=None):
+    limit = page_limit(request)
+    rows = keyset(queryset, request, field, filters).values(
+        *POST_FIELDS, cursor=F(field))[:limit + 1]
+    return StreamingHttpResponse(
+        stream(serialize_posts(rows.iterator()), limit, head),
+        content_type='application/json')
+
+
+@require_GET
+@condition(etag_func=feed_etag)
+def index(request):
+    return feed_response(Post.objects, request)
+
+
+@require_GET
+@condition(etag_func=feed_etag)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(group.posts, request, head={'group': {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }})
+
+
+@require_GET
+@condition(etag_func=feed_etag)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    following = follow_graph.is_following(request.user.pk, author.pk)
+    return feed_response(author.posts, request, head={'author': {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'post_count': get_stats(author).posts_count,
+        'following': following,
+    }})
+
+
+@require_GET
+@condition(etag_func=feed_etag)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Требуется вход на сайт.'}, status=401)
+    return feed_response(
+        Post.objects, request, field='timeline_entries__pub_date',
+        filters={'timeline_entries__user': request.user})
+
+
+@require_GET
+@condition(etag_func=post_etag)
+def post_detail(request, post_id):
+    """Пост и страница его комментариев, новые первыми."""
+    post = get_object_or_404(
+        Post.objects.values(
+            *POST_FIELDS, 'author_id', 'author__stats__posts_count'),
+        id=post_id)
+    _, data = next(serialize_posts([post]))
+    post_count = post['author__stats__posts_count']
+    if post_count is None:
+        post_count = get_stats(User(pk=post['author_id'])).posts_count
+    data['author']['post_count'] = post_count
+    limit = page_limit(request)
+    rows = keyset(
+        Comment.objects.filter(post_id=post_id), request, 'created',
+    ).values(*COMMENT_FIELDS, cursor=F('created'))[:limit + 1]
+    return StreamingHttpResponse(
+        stream(serialize_comments(rows.iterator()), limit, {'post': data}),
+        content_type='application/json')
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import search, signals  # noqa: F401
+
+        post_migrate.connect(search.restore_triggers, sender=self)
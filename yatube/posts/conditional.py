@@ -0,0 +1,73 @@
+"""ETag и Last-Modified для условных GET-запросов к страницам постов.
+
+Валидаторы считаются до представления и до кэша страниц, так что
+ответ 304 обходится без шаблонов и без запросов к базе. Все, что
+показывают ленты, двигает их поколение и запоминает время этой записи;
+комментарии поста вместо поколения двигают время поста в кэше.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .feed_cache import get_generation, get_modified, now_and_on_commit
+
+
+def make_etag(request, *parts):
+    """ETag из поколения лент, читателя, адреса и parts: страница
+    зависит от того, кто ее смотрит."""
+    key = ':'.join(map(str, (
+        get_generation(), request.user.pk, request.get_full_path(),
+        *parts)))
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def _post_key(post_id):
+    return f'post:modified:{post_id}'
+
+
+def post_modified(post_id):
+    """Время последней записи комментария к посту."""
+    modified = cache.get(_post_key(post_id))
+    if modified is None:
+        cache.add(_post_key(post_id), time.time(),
+                  settings.POST_MODIFIED_TIMEOUT)
+        modified = cache.get(_post_key(post_id))
+    return modified
+
+
+def touch_post(post_id):
+    now_and_on_commit(lambda: cache.set(
+        _post_key(post_id), time.time(), settings.POST_MODIFIED_TIMEOUT))
+
+
+def settled(timestamp):
+    """Last-Modified по времени записи.
+
+    HTTP-дата точна до секунды, и вторая запись в ту же секунду не
+    сдвинула бы ее: клиент с If-Modified-Since получил бы 304 со старой
+    страницей. Поэтому, пока секунда записи не прошла, Last-Modified не
+    отдается, а If-Modified-Since не проверяется.
+    """
+    second = int(timestamp)
+    if second >= int(time.time()):
+        return None
+    return datetime.fromtimestamp(second, timezone.utc)
+
+
+def feed_etag(request, *args, **kwargs):
+    return make_etag(request)
+
+
+def feed_last_modified(request, *args, **kwargs):
+    return settled(get_modified())
+
+
+def post_etag(request, post_id):
+    return make_etag(request, post_modified(post_id))
+
+
+def post_last_modified(request, post_id):
+    return settled(max(get_modified(), post_modified(post_id)))
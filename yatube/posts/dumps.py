@@ -0,0 +1,216 @@
+"""Потоковые импорт и экспорт данных в формате dumpdata.
+
+loaddata и dumpdata держат весь документ в памяти и сохраняют объекты
+по одному. Здесь файл читается кусками, объекты вставляются пачками
+bulk_create, и память не растет с размером дампа.
+"""
+import json
+import re
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.color import no_style
+from django.core.serializers import json as json_serializer
+from django.db import connections, reset_queries, transaction
+from django.utils import timezone
+
+from .utils import batched, iter_keyset
+
+# модели дампа в порядке зависимостей: авторы раньше постов,
+# посты раньше комментариев
+MODELS = (
+    'auth.user',
+    'posts.group',
+    'posts.post',
+    'posts.comment',
+    'posts.follow',
+)
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r'\s*')
+
+
+class _Buffer:
+    """Непрочитанный остаток потока: текущий кусок и позиция в нем."""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text, self.position, self.eof = '', 0, False
+        self.decoder = json.JSONDecoder()
+
+    def read_more(self):
+        if self.eof:
+            raise ValueError('Дамп оборвался до конца массива.')
+        chunk = self.stream.read(self.chunk_size)
+        self.text = self.text[self.position:] + chunk
+        self.position, self.eof = 0, not chunk
+
+    def peek(self):
+        """Следующий непробельный символ, не сдвигая позицию на него."""
+        while True:
+            self.position = WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                return self.text[self.position]
+            self.read_more()
+
+    def take(self, char, message):
+        if self.peek() != char:
+            raise ValueError(message)
+        self.position += 1
+
+    def value(self):
+        """Очередное JSON-значение; дочитывает поток, пока оно не
+        поместится в буфер целиком."""
+        self.peek()
+        while True:
+            try:
+                obj, self.position = self.decoder.raw_decode(
+                    self.text, self.position)
+                return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.read_more()
+
+
+def iter_objects(stream, chunk_size=CHUNK_SIZE):
+    """Элементы JSON-массива верхнего уровня по одному.
+
+    В памяти только текущий элемент и непрочитанный остаток куска.
+    """
+    buffer = _Buffer(stream, chunk_size)
+    buffer.take('[', 'Дамп должен быть JSON-массивом.')
+    if buffer.peek() == ']':
+        return
+    while True:
+        yield buffer.value()
+        char = buffer.peek()
+        if char == ']':
+            return
+        buffer.take(',', f'Ожидалась запятая, а не {char!r}.')
+
+
+@contextmanager
+def explicit_dates(model):
+    """Отключает auto_now и auto_now_add на время вставки.
+
+    bulk_create вызывает pre_save полей, и даты из дампа затерлись бы
+    текущим временем. Даты, которых в дампе нет, проставляет load().
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield fields
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _insert(model, batch, fields, ignore_conflicts, using):
+    deserialized = list(serializers.deserialize(
+        'python', batch, using=using, ignorenonexistent=True))
+    instances = [item.object for item in deserialized]
+    now = timezone.now()
+    for instance in instances:
+        for field in fields:
+            if getattr(instance, field.attname) is None:
+                setattr(instance, field.attname, now)
+    model._default_manager.using(using).bulk_create(
+        instances, ignore_conflicts=ignore_conflicts)
+    # Связи многие-ко-многим (группы и права пользователей) — строками
+    # промежуточных таблиц, тоже пачкой.
+    rows = {}
+    for item in deserialized:
+        for name, pks in item.m2m_data.items():
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            rows.setdefault(through, []).extend(
+                through(**{source: item.object.pk, target: pk})
+                for pk in pks)
+    for through, objects in rows.items():
+        through._default_manager.using(using).bulk_create(
+            objects, ignore_conflicts=ignore_conflicts)
+
+
+def load(path, batch_size=1000, ignore_conflicts=False, using='default'):
+    """Загружает дамп из файла path и возвращает {модель: число объектов}.
+
+    Файл читается по разу на каждую модель MODELS, поэтому порядок
+    объектов в нем не важен: внешние ключи всегда указывают на уже
+    вставленные строки. Каждая пачка — своя транзакция. Объекты
+    других моделей (права, сессии, журнал админки) пропускаются.
+    Сигналы post_save не отправляются: ленты, счетчики и поколение
+    кэша нужно пересчитать после загрузки.
+    """
+    loaded = {}
+    for label in MODELS:
+        model = apps.get_model(label)
+        loaded[label] = 0
+        with open(path, encoding='utf-8') as stream, \
+                explicit_dates(model) as fields:
+            objects = (
+                obj for obj in iter_objects(stream)
+                if obj.get('model', '').lower() == label
+            )
+            for batch in batched(objects, batch_size):
+                with transaction.atomic(using=using):
+                    _insert(model, batch, fields, ignore_conflicts, using)
+                loaded[label] += len(batch)
+                # При DEBUG=True Django копит текст запросов, а вставка
+                # пачкой — это мегабайты SQL.
+                reset_queries()
+    # Ключи пришли из дампа, и на PostgreSQL последовательности нужно
+    # сдвинуть за них, как это делает loaddata.
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [apps.get_model(label) for label in MODELS])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    return loaded
+
+
+class Serializer(json_serializer.Serializer):
+    """JSON-сериализатор, который берет связи многие-ко-многим из
+    prefetch_related, а не запросом на каждый объект."""
+
+    def handle_m2m_field(self, obj, field):
+        if field.remote_field.through._meta.auto_created:
+            self._current[field.name] = [
+                related.pk for related in getattr(obj, field.name).all()]
+
+
+def iter_dump(batch_size=1000, using='default'):
+    """Объекты MODELS по порядку, пачками по ключу: без OFFSET
+    и без курсора, открытого на всю выгрузку."""
+    for label in MODELS:
+        model = apps.get_model(label)
+        related = [field.name for field in model._meta.many_to_many]
+        yield from iter_keyset(
+            model._default_manager.using(using).prefetch_related(*related),
+            batch_size)
+
+
+def dump(stream, batch_size=1000, using='default'):
+    """Пишет MODELS в stream в формате dumpdata; возвращает число
+    объектов."""
+    count = 0
+
+    def counted():
+        nonlocal count
+        for obj in iter_dump(batch_size, using):
+            count += 1
+            yield obj
+
+    Serializer().serialize(counted(), stream=stream)
+    return count
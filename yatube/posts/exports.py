@@ -0,0 +1,153 @@
+"""Выгрузка всего, что написал автор: посты и комментарии в NDJSON
+или CSV, по желанию в zip вместе с картинками постов.
+
+Все функции — генераторы байтов: строки читаются пачками по ключу,
+файлы картинок — кусками, и память не растет с объемом выгрузки.
+"""
+import csv
+import zipfile
+
+from .models import Comment, Post
+from .utils import dumps, iter_keyset
+
+# тип файла -> (Content-Type, расширение)
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+COLUMNS = ('type', 'id', 'post', 'group', 'text', 'date', 'image')
+CHUNK_SIZE = 1000
+# размер кусков, которыми отдается тело ответа и читаются картинки
+BUFFER_SIZE = 64 * 1024
+
+
+def iter_rows(author, chunk_size=CHUNK_SIZE):
+    """Посты, затем комментарии автора как словари с полями COLUMNS."""
+    posts = iter_keyset(Post.objects.filter(author=author).values(
+        'pk', 'group__slug', 'text', 'pub_date', 'image'), chunk_size)
+    for row in posts:
+        yield {
+            'type': 'post', 'id': row['pk'], 'post': None,
+            'group': row['group__slug'], 'text': row['text'],
+            'date': row['pub_date'], 'image': row['image'] or None,
+        }
+    comments = iter_keyset(Comment.objects.filter(author=author).values(
+        'pk', 'post_id', 'text', 'created'), chunk_size)
+    for row in comments:
+        yield {
+            'type': 'comment', 'id': row['pk'], 'post': row['post_id'],
+            'group': None, 'text': row['text'], 'date': row['created'],
+            'image': None,
+        }
+
+
+def ndjson(rows):
+    for row in rows:
+        yield (dumps(row) + '\n').encode()
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(COLUMNS).encode()
+    for row in rows:
+        yield writer.writerow([
+            '' if row[column] is None
+            else row[column].isoformat() if column == 'date'
+            else row[column]
+            for column in COLUMNS
+        ]).encode()
+
+
+def buffered(chunks, size=BUFFER_SIZE):
+    """Склеивает мелкие куски в куски около size байт: по строке
+    на запись сервер отдавал бы ответ слишком мелко."""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer.clear()
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def image_names(author, chunk_size=CHUNK_SIZE):
+    """Имена картинок постов автора без повторов: одинаковые картинки
+    хранилище складывает в один файл."""
+    queryset = Post.objects.filter(author=author).exclude(
+        image='').values('image').distinct()
+    for row in iter_keyset(queryset, chunk_size, key='image'):
+        yield row['image']
+
+
+class Sink:
+    """Приемник для zipfile без seek: архив пишется в него,
+    а генератор забирает уже готовые байты."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def zipped(name, chunks, images, storage):
+    """Zip-архив потоком: файл name из chunks и картинки images из
+    storage под их именами в хранилище.
+
+    Без seek zipfile пишет размеры после данных, поэтому архив не
+    нужно держать целиком.
+    """
+    sink = Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(name, 'w', force_zip64=True) as entry:
+            for chunk in chunks:
+                entry.write(chunk)
+                data = sink.drain()
+                if data:
+                    yield data
+        for image in images:
+            try:
+                source = storage.open(image)
+            except OSError:
+                # Файл пропал из хранилища: строка поста все равно
+                # выгружена, картинки в архиве не будет.
+                continue
+            # JPEG и PNG уже сжаты: кладем как есть.
+            info = zipfile.ZipInfo(image)
+            info.compress_type = zipfile.ZIP_STORED
+            with source, archive.open(info, 'w', force_zip64=True) as entry:
+                for chunk in iter(lambda: source.read(BUFFER_SIZE), b''):
+                    entry.write(chunk)
+                    yield sink.drain()
+    yield sink.drain()
+
+
+def export(author, fmt='ndjson', images=False, chunk_size=CHUNK_SIZE):
+    """Байты выгрузки автора; с images — zip с картинками."""
+    rows = iter_rows(author, chunk_size)
+    chunks = buffered(ndjson(rows) if fmt == 'ndjson' else csv_lines(rows))
+    if not images:
+        return chunks
+    storage = Post._meta.get_field('image').storage
+    name = f'{author.username}.{FORMATS[fmt][1]}'
+    return zipped(name, chunks, image_names(author, chunk_size), storage)
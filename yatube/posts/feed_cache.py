@@ -0,0 +1,85 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+
+GENERATION_KEY = 'feed:generation'
+MODIFIED_KEY = 'feed:modified'
+
+
+def get_generation():
+    """Текущее поколение лент; входит в ключи кэша страниц."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Счетчик вытеснен из кэша: начинаем с заведомо нового значения,
+        # чтобы не попасть на страницы, закэшированные до вытеснения.
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def get_modified():
+    """Время последней записи, которая сдвинула поколение лент."""
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        # Время вытеснено: считаем, что запись была только что.
+        cache.add(MODIFIED_KEY, time.time(), None)
+        modified = cache.get(MODIFIED_KEY)
+    return modified
+
+
+def now_and_on_commit(function):
+    """Сбрасывает кэш сейчас и еще раз после коммита.
+
+    Повторно после коммита: иначе параллельный запрос успеет положить
+    в кэш еще не закоммиченное состояние под новым ключом.
+    """
+    function()
+    transaction.on_commit(function)
+
+
+def bump_generation():
+    """Инвалидирует все закэшированные страницы лент разом."""
+    cache.set(MODIFIED_KEY, time.time(), None)
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        return get_generation()
+
+
+def page_key(request):
+    """Ключ страницы в кэше: поколение лент, читатель и полный адрес."""
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return 'feed:page:{}:{}:{}'.format(
+        get_generation(), request.user.pk or 0, url)
+
+
+def feed_cache_page(timeout=None):
+    """Кэширует страницу ленты на сервере под ключом поколения лент
+    и читателя.
+
+    В отличие от cache_page, браузеру max-age и Expires не отдаются:
+    он держал бы ленту у себя весь TTL и не видел бы новых постов.
+    Ответ помечен private, max-age=0, и клиент каждый раз
+    переспрашивает сервер, а ETag ленты отвечает ему 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            key = page_key(request)
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    cache.set(key, response,
+                              timeout or settings.FEED_CACHE_TIMEOUT)
+            patch_cache_control(response, private=True, max_age=0)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,86 @@
+"""Индекс графа подписок в кэше.
+
+Для каждого читателя в кэше лежит отсортированный массив id авторов,
+на которых он подписан (array('I'), по 4 байта на подписку). Массив
+грузится из базы при первом обращении, а проверка «подписан ли»
+сводится к бинарному поиску в нем, для целой страницы авторов — по
+одному чтению из кэша.
+
+Запись Follow стирает массив читателя; он соберется заново при
+следующем обращении. Стирать, а не править на месте, надежнее: две
+параллельные подписки одного читателя не потеряют друг друга. Массив
+живет в кэше не дольше FOLLOW_GRAPH_TIMEOUT: подписки, записанные в
+обход сигналов и без invalidate, рано или поздно станут видны.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .feed_cache import now_and_on_commit
+from .models import Follow
+from .utils import batched
+
+TYPECODE = 'I'
+
+
+def _key(user_id):
+    return f'follow:graph:{user_id}'
+
+
+def _load(user_id):
+    return array(TYPECODE, Follow.objects.filter(user_id=user_id).order_by(
+        'author_id').values_list('author_id', flat=True).iterator())
+
+
+def followees(user_id):
+    """Отсортированный массив id авторов, которых читает user_id."""
+    data = cache.get(_key(user_id))
+    if data is None:
+        ids = _load(user_id)
+        cache.set(_key(user_id), ids.tobytes(),
+                  settings.FOLLOW_GRAPH_TIMEOUT)
+        return ids
+    ids = array(TYPECODE)
+    ids.frombytes(data)
+    return ids
+
+
+def _contains(ids, author_id):
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def is_following(user_id, author_id):
+    """Подписан ли user_id на author_id; для анонима — нет."""
+    if user_id is None:
+        return False
+    return _contains(followees(user_id), author_id)
+
+
+def following(user_id, author_ids):
+    """Те из author_ids, на кого подписан user_id: одно чтение из кэша
+    на всю страницу авторов."""
+    if user_id is None:
+        return set()
+    ids = followees(user_id)
+    return {author_id for author_id in author_ids
+            if _contains(ids, author_id)}
+
+
+def invalidate(user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+
+
+def changed(user_id):
+    now_and_on_commit(lambda: invalidate([user_id]))
+
+
+def invalidate_all(batch_size=1000):
+    """Стирает массивы всех читателей, у которых есть подписки: для
+    массовой загрузки, которая пишет Follow без сигналов."""
+    user_ids = Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True).distinct().iterator()
+    for batch in batched(user_ids, batch_size):
+        invalidate(batch)
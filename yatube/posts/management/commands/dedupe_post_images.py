@@ -0,0 +1,67 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import delete
+
+from posts.feed_cache import bump_generation
+from posts.models import Post
+
+HASHED_NAME = re.compile(r'/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+class Command(BaseCommand):
+    help = ('Переводит картинки постов на адресацию по содержимому: '
+            'одинаковые файлы сливаются в один, их миниатюры удаляются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько имен файлов читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        last_name = ''
+        moved = merged = missing = 0
+        while True:
+            # Ключевая пагинация по имени: таблица меняется по ходу,
+            # поэтому один длинный курсор держать нельзя.
+            names = list(Post.objects.filter(image__gt=last_name).order_by(
+                'image').values_list('image', flat=True).distinct()[
+                :options['batch_size']])
+            if not names:
+                break
+            last_name = names[-1]
+            for name in names:
+                if HASHED_NAME.search(name):
+                    continue
+                if not storage.exists(name):
+                    missing += 1
+                    continue
+                with storage.open(name) as content:
+                    new_name = storage.hashed_name(name, content)
+                    duplicate = storage.exists(new_name)
+                    if options['dry_run']:
+                        merged += duplicate
+                        moved += not duplicate
+                        continue
+                    if not duplicate:
+                        # save() сам пересчитает имя по содержимому.
+                        new_name = storage.save(name, content)
+                Post.objects.filter(image=name).update(
+                    image=new_name, updated=timezone.now())
+                # Удаляет исходный файл, его миниатюры и записи sorl.
+                delete(field.attr_class(None, field, name))
+                merged += duplicate
+                moved += not duplicate
+        if not options['dry_run']:
+            bump_generation()
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено: {moved}, слито с дубликатами: {merged}, '
+            f'файлов не найдено: {missing}'))
@@ -0,0 +1,45 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exports
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты и комментарии автора в NDJSON или CSV '
+            'потоком, по желанию в zip вместе с картинками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Куда писать выгрузку; по умолчанию в stdout.',
+        )
+        parser.add_argument(
+            '--format', choices=sorted(exports.FORMATS), default='ndjson',
+        )
+        parser.add_argument(
+            '--images', action='store_true',
+            help='Запаковать выгрузку в zip вместе с картинками постов.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=exports.CHUNK_SIZE,
+            help='Сколько строк читать одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(username=options['username']).first()
+        if author is None:
+            raise CommandError(f'Пользователя {options["username"]} нет.')
+        chunks = exports.export(author, options['format'],
+                                options['images'], options['chunk_size'])
+        if options['path'] == '-':
+            stream = sys.stdout.buffer
+            stream.writelines(chunks)
+            stream.flush()
+        else:
+            with open(options['path'], 'wb') as stream:
+                stream.writelines(chunks)
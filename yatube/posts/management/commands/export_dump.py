@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import dumps
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии и подписки '
+            'в формате dumpdata потоком, пачками по ключу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Куда писать дамп; по умолчанию в stdout.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько объектов читать одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            count = dumps.dump(sys.stdout, options['batch_size'])
+        else:
+            with open(options['path'], 'w', encoding='utf-8') as stream:
+                count = dumps.dump(stream, options['batch_size'])
+        self.stderr.write(f'Выгружено объектов: {count}')
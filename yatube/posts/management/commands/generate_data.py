@@ -0,0 +1,324 @@
+import argparse
+import datetime
+import io
+import random
+import time
+from array import array
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from PIL import Image
+
+from posts import follow_graph, search
+from posts.feed_cache import bump_generation
+from posts.management.words import WORDS
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import batched
+
+User = get_user_model()
+
+
+def power_law(count, exponent):
+    """Накопленные веса для random.choices: k-й по популярности
+    получает вес 1 / k ** exponent, exponent=0 — равномерно."""
+    return list(accumulate(rank ** -exponent for rank in range(1, count + 1)))
+
+
+WORD_WEIGHTS = power_law(len(WORDS), 1.0)
+# дата самого нового поста по умолчанию: от текущего времени данные
+# зависели бы от дня запуска
+UNTIL = datetime.date(2025, 1, 1)
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f'Дата должна быть в формате ГГГГ-ММ-ДД, а не {value!r}.')
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками с перекошенными, как '
+            'в жизни, распределениями. Один и тот же --seed с теми же '
+            '--until и --days дает те же данные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля постов с картинкой, от 0 до 1.',
+        )
+        parser.add_argument(
+            '--image-variants', type=int, default=20,
+            help='Сколько разных картинок сгенерировать.',
+        )
+        parser.add_argument(
+            '--author-skew', type=float, default=1.1,
+            help='Показатель степенного закона для числа постов автора.',
+        )
+        parser.add_argument(
+            '--follow-skew', type=float, default=1.0,
+            help='Показатель степенного закона для числа подписчиков.',
+        )
+        parser.add_argument(
+            '--comment-skew', type=float, default=1.2,
+            help='Показатель степенного закона для комментариев к посту.',
+        )
+        parser.add_argument(
+            '--group-share', type=float, default=0.6,
+            help='Доля постов, опубликованных в группах.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --until распределить посты.',
+        )
+        parser.add_argument(
+            '--until', type=parse_date, default=UNTIL,
+            help='Дата самого нового поста, ГГГГ-ММ-ДД.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Начало имен пользователей и адресов групп.',
+        )
+        parser.add_argument(
+            '--password', default='password',
+            help='Пароль всех пользователей, чтобы под ними входить.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересобирать ленты, счетчики и статистику планировщика.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        self.until = datetime.datetime.combine(
+            options['until'], datetime.time(), datetime.timezone.utc)
+        prefix = options['prefix']
+        if (User.objects.filter(username__startswith=prefix).exists()
+                or Group.objects.filter(slug__startswith=prefix).exists()):
+            raise CommandError(
+                f'Данные с префиксом {prefix!r} уже есть, задайте другой '
+                f'--prefix.')
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя.')
+
+        # Поисковый индекс дешевле пересобрать один раз в конце, чем
+        # обновлять триггером на каждую вставленную строку.
+        search.drop_triggers()
+        try:
+            users = self.step('Пользователи', self.create_users)
+            # Одни и те же «звезды» много пишут и собирают подписчиков.
+            stars = list(users)
+            self.random.shuffle(stars)
+            groups = self.step('Группы', self.create_groups)
+            posts, dates = self.step(
+                'Посты', self.create_posts, stars, groups)
+            self.step(
+                'Комментарии', self.create_comments, users, posts, dates)
+            self.step('Подписки', self.create_follows, users, stars)
+            # Подписки вставлены без сигналов: индекс подписок в кэше
+            # про них не знает.
+            for batch in batched(users, self.options['batch_size']):
+                follow_graph.invalidate(batch)
+        finally:
+            search.install()
+        if search.is_supported():
+            self.step('Поисковый индекс', search.rebuild)
+
+        if not options['skip_derived']:
+            call_command('rebuild_timelines', stdout=self.stdout)
+            call_command('reconcile_author_stats', stdout=self.stdout)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        bump_generation()
+
+    def step(self, title, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = f'{time.perf_counter() - started:.1f} с'
+        if result is None:
+            self.stdout.write(f'{title}: {elapsed}')
+        else:
+            count = len(result[0] if isinstance(result, tuple) else result)
+            self.stdout.write(f'{title}: {count} за {elapsed}')
+        return result
+
+    def insert(self, model, fields, rows):
+        """Вставляет строки пачками через executemany, каждая пачка —
+        в своей транзакции.
+
+        Значения уже готовы для базы, а bulk_create на миллионах строк
+        тратит больше времени на модели и компиляцию SQL, чем сама база.
+        """
+        quote = connection.ops.quote_name
+        columns = [model._meta.get_field(name).column for name in fields]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table), ', '.join(map(quote, columns)),
+            ', '.join(['%s'] * len(columns)))
+        for batch in batched(rows, self.options['batch_size']):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+
+    def new_ids(self, model, last_pk):
+        # Ключи вставленных строк читаем обратно одним запросом.
+        return array('q', model.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True).iterator())
+
+    def last_pk(self, model):
+        last = model.objects.order_by('-pk').values_list('pk', flat=True)
+        return last.first() or 0
+
+    def adapt(self, timestamp):
+        return connection.ops.adapt_datetimefield_value(
+            datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc))
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        password = make_password(self.options['password'])
+        joined = self.adapt((self.until - datetime.timedelta(
+            days=self.options['days'])).timestamp())
+        last_pk = self.last_pk(User)
+        self.insert(User, (
+            'username', 'password', 'first_name', 'last_name', 'email',
+            'is_superuser', 'is_staff', 'is_active', 'date_joined',
+        ), (
+            (f'{prefix}{number}', password,
+             self.random.choice(WORDS).capitalize(), '', '',
+             False, False, True, joined)
+            for number in range(self.options['users'])
+        ))
+        return self.new_ids(User, last_pk)
+
+    def create_groups(self):
+        prefix = self.options['prefix']
+        last_pk = self.last_pk(Group)
+        self.insert(Group, ('title', 'slug', 'description'), (
+            (f'Группа {number}', f'{prefix}-{number}', self.text(5, 20))
+            for number in range(self.options['groups'])
+        ))
+        return self.new_ids(Group, last_pk)
+
+    def create_images(self):
+        """Несколько разных картинок: хранилище раскладывает их по
+        хэшу, и посты ссылаются на общие файлы."""
+        storage = Post._meta.get_field('image').storage
+        names = []
+        for _ in range(self.options['image_variants']):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', (64, 48), color).save(buffer, 'JPEG')
+            names.append(storage.save(
+                'posts/generated.jpg', ContentFile(buffer.getvalue())))
+        return names
+
+    def create_posts(self, stars, groups):
+        count = self.options['posts']
+        images = (self.create_images()
+                  if self.options['images'] > 0 else [])
+        author_weights = power_law(len(stars), self.options['author_skew'])
+        group_weights = power_law(len(groups), 1.0) if groups else None
+        # Даты растут вместе с id, как у постов, написанных по очереди.
+        end = self.until.timestamp()
+        start = end - datetime.timedelta(
+            days=self.options['days']).total_seconds()
+        step = (end - start) / max(count, 1)
+        dates = array('d', (start + step * (number + self.random.random())
+                            for number in range(count)))
+        last_pk = self.last_pk(Post)
+        chunk = self.options['batch_size']
+
+        def posts():
+            for offset in range(0, count, chunk):
+                size = min(chunk, count - offset)
+                authors = self.random.choices(
+                    stars, cum_weights=author_weights, k=size)
+                for number, author_id in enumerate(authors, offset):
+                    group_id = None
+                    if groups and (self.random.random()
+                                   < self.options['group_share']):
+                        group_id = self.random.choices(
+                            groups, cum_weights=group_weights)[0]
+                    image = ''
+                    if images and (self.random.random()
+                                   < self.options['images']):
+                        image = self.random.choice(images)
+                    pub_date = self.adapt(dates[number])
+                    yield (author_id, group_id, self.text(5, 80), image,
+                           pub_date, pub_date)
+
+        self.insert(Post, ('author', 'group', 'text', 'image', 'pub_date',
+                           'updated'), posts())
+        return self.new_ids(Post, last_pk), dates
+
+    def create_comments(self, users, posts, dates):
+        count = self.options['comments'] if posts else 0
+        # Популярность поста не связана с его возрастом.
+        ranked = array('q', range(len(posts)))
+        self.random.shuffle(ranked)
+        weights = power_law(len(ranked), self.options['comment_skew'])
+        until = self.until.timestamp()
+        chunk = self.options['batch_size']
+        last_pk = self.last_pk(Comment)
+
+        def comments():
+            for offset in range(0, count, chunk):
+                size = min(chunk, count - offset)
+                for index in self.random.choices(
+                        ranked, cum_weights=weights, k=size):
+                    # Обсуждение затихает через несколько часов.
+                    created = min(until, dates[index]
+                                  + self.random.expovariate(1 / 7200))
+                    yield (posts[index], self.random.choice(users),
+                           self.text(1, 25), self.adapt(created))
+
+        self.insert(Comment, ('post', 'author', 'text', 'created'),
+                    comments())
+        return self.new_ids(Comment, last_pk)
+
+    def create_follows(self, users, stars):
+        count = min(self.options['follows'],
+                    len(users) * (len(users) - 1))
+        weights = power_law(len(stars), self.options['follow_skew'])
+        chunk = self.options['batch_size']
+        last_pk = self.last_pk(Follow)
+        seen = set()
+
+        def follows():
+            created = 0
+            while created < count:
+                authors = self.random.choices(
+                    stars, cum_weights=weights, k=chunk)
+                for author_id in authors:
+                    user_id = self.random.choice(users)
+                    edge = user_id << 32 | author_id
+                    if user_id == author_id or edge in seen:
+                        continue
+                    seen.add(edge)
+                    yield user_id, author_id
+                    created += 1
+                    if created == count:
+                        return
+
+        self.insert(Follow, ('user', 'author'), follows())
+        return self.new_ids(Follow, last_pk)
+
+    def text(self, shortest, longest):
+        """Текст из частых и редких слов вперемешку, как живой."""
+        words = self.random.choices(
+            WORDS, cum_weights=WORD_WEIGHTS,
+            k=self.random.randint(shortest, longest))
+        return ' '.join(words).capitalize() + '.'
@@ -0,0 +1,36 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import dumps, follow_graph
+from posts.feed_cache import bump_generation
+
+
+class Command(BaseCommand):
+    help = ('Загружает дамп формата dumpdata (пользователи, группы, посты, '
+            'комментарии, подписки) потоком, пачками bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к JSON-дампу.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Объектов в одной пачке и транзакции.',
+        )
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать объекты, чьи ключи уже есть в базе.',
+        )
+
+    def handle(self, *args, **options):
+        loaded = dumps.load(
+            options['path'], batch_size=options['batch_size'],
+            ignore_conflicts=options['ignore_conflicts'])
+        self.stdout.write(', '.join(
+            f'{label}: {count}' for label, count in loaded.items()))
+        # bulk_create не отправляет сигналы: производные данные
+        # пересчитываются целиком.
+        call_command('rebuild_timelines', stdout=self.stdout)
+        call_command('reconcile_author_stats', stdout=self.stdout)
+        follow_graph.invalidate_all()
+        bump_generation()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {sum(loaded.values())}'))
@@ -0,0 +1,426 @@
+import datetime
+import http.cookiejar
+import json
+import math
+import multiprocessing
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import accumulate
+from urllib.parse import quote, urlencode
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from posts.management.words import WORDS
+from posts.models import Group, Post
+
+User = get_user_model()
+
+# маршрут posts/urls.py -> вес в смеси по умолчанию
+MIX = {
+    'index': 25,
+    'group_posts': 10,
+    'profile': 10,
+    'post_detail': 25,
+    'comments': 5,
+    'search': 5,
+    'follow_index': 8,
+    'export': 1,
+    'post_create': 2,
+    'post_edit': 2,
+    'add_comment': 5,
+    'profile_follow': 4,
+    'profile_unfollow': 4,
+}
+# маршруты, которые имеют смысл только для вошедшего пользователя
+AUTH_ONLY = {
+    'follow_index', 'export', 'post_create', 'post_edit', 'add_comment',
+    'profile_follow', 'profile_unfollow',
+}
+PERCENTILES = (50, 95, 99)
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Редирект после записи — это ответ, а не повод для второго
+    запроса: иначе время записи смешалось бы со временем страницы."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Session:
+    """Клиент с cookie и CSRF-токеном, как браузер одного человека."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, method, path, data=None):
+        """Выполняет запрос; возвращает (статус, секунды).
+
+        Статус 0 — сеть или тайм-аут.
+        """
+        url = self.base_url + path
+        body, headers = None, {}
+        if method == 'POST':
+            data = {**(data or {}), 'csrfmiddlewaretoken': self.csrf_token()}
+            body = urlencode(data).encode()
+            headers = {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Referer': url,
+            }
+        request = urllib.request.Request(
+            url, data=body, headers=headers, method=method)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            error.read()
+            status = error.code
+        except OSError:
+            status = 0
+        return status, time.perf_counter() - started
+
+    def login(self, username, password):
+        self.request('GET', '/auth/login/')
+        status, _ = self.request('POST', '/auth/login/', {
+            'username': username, 'password': password})
+        return status == 302
+
+
+def fixed(method, path):
+    return lambda chooser, targets, account: (method, path, None)
+
+
+def post_path(suffix=''):
+    """Путь к случайному посту из targets с окончанием suffix."""
+    def route(chooser, targets, account):
+        post_id = chooser.choice(targets['posts'])
+        return 'GET', f'/posts/{post_id}/{suffix}', None
+    return route
+
+
+def group_posts(chooser, targets, account):
+    return 'GET', f'/group/{chooser.choice(targets["groups"])}/', None
+
+
+def profile(chooser, targets, account):
+    username = chooser.choice(targets['users'])
+    return 'GET', f'/profile/{quote(username)}/', None
+
+
+def profile_follow(chooser, targets, account):
+    username = chooser.choice(targets['users'])
+    if username != account['username']:
+        account['following'].add(username)
+    return 'GET', f'/profile/{quote(username)}/follow/', None
+
+
+def profile_unfollow(chooser, targets, account):
+    username = chooser.choice(sorted(account['following']))
+    account['following'].discard(username)
+    return 'GET', f'/profile/{quote(username)}/unfollow/', None
+
+
+def search(chooser, targets, account):
+    return 'GET', f'/search/?{urlencode({"q": chooser.choice(WORDS)})}', None
+
+
+def post_edit(chooser, targets, account):
+    """Сохраняет свой пост с тем же текстом и группой: проходит весь
+    путь записи, не портя данные. Без своих постов — открывает форму
+    чужого, и сервер отвечает редиректом."""
+    if not account['posts']:
+        post_id = chooser.choice(targets['posts'])
+        return 'GET', f'/posts/{post_id}/edit/', None
+    post_id, group_id, text = chooser.choice(account['posts'])
+    return 'POST', f'/posts/{post_id}/edit/', {
+        'text': text, 'group': group_id or ''}
+
+
+def add_comment(chooser, targets, account):
+    post_id = chooser.choice(targets['posts'])
+    return 'POST', f'/posts/{post_id}/comment/', {
+        'text': 'Нагрузочный комментарий'}
+
+
+# маршрут -> функция (chooser, targets, account) -> (метод, путь, форма);
+# account — состояние вошедшего пользователя: его посты и авторы, на
+# которых он подписан (отписка от чужого автора — это 404)
+ROUTES = {
+    'index': fixed('GET', '/'),
+    'group_posts': group_posts,
+    'profile': profile,
+    'post_detail': post_path(),
+    'comments': post_path('comments/'),
+    'search': search,
+    'follow_index': fixed('GET', '/follow/'),
+    'export': fixed('GET', '/export/'),
+    'post_create': lambda chooser, targets, account: (
+        'POST', '/create/', {'text': 'Нагрузочный пост'}),
+    'post_edit': post_edit,
+    'add_comment': add_comment,
+    'profile_follow': profile_follow,
+    'profile_unfollow': profile_unfollow,
+}
+
+
+def build(route, chooser, targets, account):
+    """Метод, путь и данные формы для очередного запроса к route."""
+    return ROUTES[route](chooser, targets, account)
+
+
+def drive(base_url, targets, mix, account, seed, deadline, limit, timeout,
+          auth_share):
+    """Цикл одного виртуального пользователя; выполняется в потоке или
+    процессе пула. Возвращает [(маршрут, статус, секунды)]."""
+    chooser = random.Random(seed)
+    anonymous = Session(base_url, timeout)
+    member = None
+    if account is not None:
+        account = dict(account, following=set(account['following']))
+        member = Session(base_url, timeout)
+        if not member.login(account['username'], account['password']):
+            member = None
+    routes = [route for route in mix
+              if mix[route] > 0 and (member or route not in AUTH_ONLY)]
+    if not routes:
+        return []
+    weights = list(accumulate(mix[route] for route in routes))
+    results = []
+    while time.time() < deadline and (limit is None or len(results) < limit):
+        route = chooser.choices(routes, cum_weights=weights)[0]
+        if route == 'profile_unfollow' and not account['following']:
+            route = 'profile_follow'
+        logged = member is not None and (
+            route in AUTH_ONLY or chooser.random() < auth_share)
+        method, path, data = build(route, chooser, targets, account)
+        status, seconds = (member if logged else anonymous).request(
+            method, path, data)
+        label = route
+        if logged and route not in AUTH_ONLY:
+            label += '[auth]'
+        results.append((label, status, seconds))
+    return results
+
+
+def percentile(ordered, percent):
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(rows, elapsed):
+    latencies = sorted(seconds for _, _, seconds in rows)
+    summary = {
+        'requests': len(rows),
+        'errors': sum(1 for _, status, _ in rows
+                      if not 0 < status < 400),
+        'rps': round(len(rows) / elapsed, 2) if elapsed else 0,
+        'statuses': {},
+    }
+    for _, status, _ in rows:
+        summary['statuses'][str(status)] = (
+            summary['statuses'].get(str(status), 0) + 1)
+    if latencies:
+        summary['mean_ms'] = round(
+            sum(latencies) / len(latencies) * 1000, 2)
+        summary['max_ms'] = round(latencies[-1] * 1000, 2)
+        for percent in PERCENTILES:
+            summary[f'p{percent}_ms'] = round(
+                percentile(latencies, percent) * 1000, 2)
+    return summary
+
+
+def sample(queryset, field, size, chooser):
+    """До size значений field у случайных строк, без ORDER BY RANDOM()
+    по всей таблице: id выбираются наугад и отсеиваются пропуски."""
+    last = queryset.aggregate(last=Max('pk'))['last'] or 0
+    ids = chooser.sample(range(1, last + 1), min(last, size * 2))
+    return list(queryset.filter(pk__in=ids).values_list(
+        field, flat=True)[:size])
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенный сервер смесью запросов ко всем маршрутам '
+            'posts/urls.py и считает пропускную способность и перцентили '
+            'задержек по маршрутам. Запросы на запись создают посты, '
+            'комментарии и подписки в базе сервера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Адрес сервера.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Сколько секунд длится прогон.',
+        )
+        parser.add_argument(
+            '--requests', type=int,
+            help='Остановиться после стольких запросов (всего).',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Число одновременных виртуальных пользователей.',
+        )
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread',
+            help='Пул потоков или процессов.',
+        )
+        parser.add_argument(
+            '--mix', action='append', default=[], metavar='ROUTE=WEIGHT',
+            help='Вес маршрута в смеси, например --mix search=0.',
+        )
+        parser.add_argument(
+            '--auth-share', type=float, default=0.5,
+            help='Доля чтений от имени вошедшего пользователя.',
+        )
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Под пользователями с этим префиксом имени входить.',
+        )
+        parser.add_argument(
+            '--password', default='password',
+            help='Их общий пароль (как в generate_data).',
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output',
+            help='Куда сохранить результаты в JSON.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON прошлого прогона, с которым сравнить p95.',
+        )
+
+    def parse_mix(self, items):
+        mix = dict(MIX)
+        for item in items:
+            route, _, weight = item.partition('=')
+            if route not in MIX:
+                raise CommandError(
+                    f'Неизвестный маршрут {route!r}; '
+                    f'есть: {", ".join(MIX)}.')
+            try:
+                mix[route] = float(weight)
+            except ValueError:
+                raise CommandError(f'Вес в --mix {item!r} — не число.')
+        return mix
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+        chooser = random.Random(options['seed'])
+        concurrency = options['concurrency']
+        targets = {
+            'groups': sample(Group.objects.all(), 'slug', 1000, chooser),
+            'users': sample(User.objects.all(), 'username', 1000, chooser),
+            'posts': sample(Post.objects.all(), 'pk', 1000, chooser),
+        }
+        for name, values in targets.items():
+            if not values:
+                raise CommandError(
+                    f'В базе нет данных для маршрутов ({name}); '
+                    f'заполните ее командой generate_data.')
+        accounts = [
+            {
+                'username': user.username,
+                'password': options['password'],
+                'posts': list(user.posts.values_list(
+                    'pk', 'group_id', 'text')[:20]),
+                'following': list(user.follower.values_list(
+                    'author__username', flat=True)[:100]),
+            }
+            for user in User.objects.filter(
+                username__startswith=options['prefix'],
+                is_active=True).order_by('pk')[:concurrency]
+        ]
+        if not accounts:
+            self.stderr.write('Нет пользователей для входа: запросы '
+                              'на запись пропускаются.')
+
+        limit = None
+        if options['requests']:
+            limit = math.ceil(options['requests'] / concurrency)
+        if options['pool'] == 'thread':
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=concurrency, initializer=django.setup,
+                mp_context=multiprocessing.get_context('spawn'))
+        started_at = datetime.datetime.now(datetime.timezone.utc)
+        started = time.perf_counter()
+        deadline = time.time() + options['duration']
+        with executor:
+            futures = [
+                executor.submit(
+                    drive, options['url'], targets, mix,
+                    accounts[number % len(accounts)] if accounts else None,
+                    options['seed'] * 1000 + number, deadline, limit,
+                    options['timeout'], options['auth_share'])
+                for number in range(concurrency)
+            ]
+            rows = [row for future in futures for row in future.result()]
+        elapsed = time.perf_counter() - started
+
+        by_route = {}
+        for row in rows:
+            by_route.setdefault(row[0], []).append(row)
+        report = {
+            'started': started_at.isoformat(),
+            'url': options['url'],
+            'pool': options['pool'],
+            'concurrency': concurrency,
+            'seed': options['seed'],
+            'mix': mix,
+            'elapsed': round(elapsed, 3),
+            'total': summarize(rows, elapsed),
+            'routes': {route: summarize(route_rows, elapsed)
+                       for route, route_rows in sorted(by_route.items())},
+        }
+        self.print_report(report)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as stream:
+                self.print_comparison(json.load(stream), report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+
+    def print_report(self, report):
+        header = (f'{"маршрут":<24}{"запросов":>9}{"ошибок":>8}{"в с":>8}'
+                  + ''.join(f'{f"p{p}, мс":>10}' for p in PERCENTILES))
+        self.stdout.write(header)
+        rows = [*report['routes'].items(), ('всего', report['total'])]
+        for route, summary in rows:
+            self.stdout.write(
+                f'{route:<24}{summary["requests"]:>9}'
+                f'{summary["errors"]:>8}{summary["rps"]:>8.1f}'
+                + ''.join(f'{summary.get(f"p{p}_ms", 0):>10.1f}'
+                          for p in PERCENTILES))
+
+    def print_comparison(self, baseline, report):
+        self.stdout.write('\np95 против прошлого прогона:')
+        for route, summary in report['routes'].items():
+            old = baseline.get('routes', {}).get(route, {}).get('p95_ms')
+            new = summary.get('p95_ms')
+            if old and new:
+                self.stdout.write(
+                    f'{route:<24}{old:>10.1f} -> {new:>8.1f} мс '
+                    f'({(new - old) / old:+.0%})')
@@ -0,0 +1,41 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Строит миниатюры всех геометрий THUMBNAIL_ALIASES '
+            'для уже загруженных картинок постов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число процессов пула.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=16,
+            help='Сколько картинок отдавать процессу за раз.',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by(
+            'image').values_list('image', flat=True).distinct().iterator()
+        batch_size = options['workers'] * options['chunk_size'] * 4
+        done = failed = 0
+        with thumbnails.create_executor(options['workers']) as executor:
+            # Отдаем картинки пачками, чтобы не держать в памяти
+            # фьючерсы для всей таблицы постов.
+            batch = list(islice(names, batch_size))
+            while batch:
+                for errors in executor.map(thumbnails.generate, batch,
+                                           chunksize=options['chunk_size']):
+                    done += 1
+                    failed += bool(errors)
+                self.stdout.write(f'Обработано картинок: {done}')
+                batch = list(islice(names, batch_size))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}, с ошибками: {failed}'))
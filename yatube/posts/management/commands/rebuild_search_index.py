@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+from posts.feed_cache import bump_generation
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает полнотекстовые индексы постов и комментариев '
+            'и восстанавливает триггеры, которые их обновляют.')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Полнотекстовый индекс есть только у SQLite.')
+        search.install()
+        search.rebuild()
+        # Сбрасывает закэшированные страницы поиска.
+        bump_generation()
+        self.stdout.write(self.style.SUCCESS('Поисковые индексы пересобраны'))
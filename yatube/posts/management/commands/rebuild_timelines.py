@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import Follow, Timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок читателей по таблице Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id читателя; по умолчанию пересобираются все ленты.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки bulk_create.',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if not user_ids:
+            Timeline.objects.exclude(
+                user_id__in=Follow.objects.values('user_id')).delete()
+            user_ids = Follow.objects.order_by('user_id').values_list(
+                'user_id', flat=True).distinct().iterator()
+        rebuilt = 0
+        for user_id in user_ids:
+            timeline.rebuild([user_id], batch_size=options['batch_size'])
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {rebuilt}'))
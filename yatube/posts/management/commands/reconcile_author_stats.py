@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики авторов и исправляет расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько авторов сверять за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fixed = checked = 0
+        last_id = 0
+        while True:
+            author_ids = list(User.objects.filter(
+                pk__gt=last_id).order_by('pk').values_list(
+                'pk', flat=True)[:batch_size])
+            if not author_ids:
+                break
+            fixed += stats.reconcile(author_ids)
+            checked += len(author_ids)
+            last_id = author_ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено авторов: {checked}, исправлено: {fixed}'))
@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default, delete
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from posts.models import Post
+
+
+def walk(root, relative, cursor):
+    """Файлы под root/relative в порядке частей пути, строго после cursor.
+
+    Каталоги, целиком лежащие до курсора, не открываются: повторный
+    запуск продолжает обход с того места, где остановился предыдущий.
+    """
+    directory = os.path.join(root, *relative)
+    if not os.path.isdir(directory):
+        return
+    with os.scandir(directory) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        parts = relative + (entry.name,)
+        if entry.is_dir(follow_symlinks=False):
+            if parts >= cursor[:len(parts)]:
+                yield from walk(root, parts, cursor)
+        elif entry.is_file(follow_symlinks=False) and parts > cursor:
+            yield parts, entry
+
+
+def tops():
+    """Каталоги оригиналов и миниатюр относительно MEDIA_ROOT."""
+    return (Post._meta.get_field('image').upload_to.strip('/'),
+            sorl_settings.THUMBNAIL_PREFIX.strip('/'))
+
+
+def live_originals(names):
+    return set(Post.objects.filter(image__in=names).values_list(
+        'image', flat=True))
+
+
+def live_thumbnails(names):
+    """Миниатюры, о которых знает хранилище ключей sorl."""
+    keys = {add_prefix(ImageFile(name, default.storage).key): name
+            for name in names}
+    if isinstance(default.kvstore, KVStore):
+        found = KVStoreModel.objects.filter(key__in=keys).values_list(
+            'key', flat=True)
+    else:
+        found = [key for key in keys
+                 if default.kvstore._get_raw(key) is not None]
+    return {keys[key] for key in found}
+
+
+def thumbnails_of(name):
+    """Исходник name как ImageFile sorl и пути его миниатюр по записям
+    хранилища ключей."""
+    image_file = ImageFile(name, Post._meta.get_field('image').storage)
+    keys = default.kvstore._get(image_file.key, identity='thumbnails')
+    thumbnails = filter(None, map(default.kvstore._get, keys or ()))
+    return image_file, [(thumbnail.name, thumbnail.storage.path(
+        thumbnail.name)) for thumbnail in thumbnails]
+
+
+class Command(BaseCommand):
+    help = ('Ищет в media/posts и в каталоге миниатюр sorl файлы, на '
+            'которые не ссылаются ни посты, ни хранилище ключей, и '
+            'переносит их в карантин или удаляет.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько файлов сверять с базой за раз.',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=settings.MEDIA_SWEEP_RATE,
+            help='Не больше стольких файлов в секунду.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=0,
+            help='Остановиться после стольких файлов; 0 — без предела.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=settings.MEDIA_SWEEP_MIN_AGE,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--state-file', default=settings.MEDIA_SWEEP_STATE_FILE,
+            help='Где хранить курсор обхода между запусками.',
+        )
+        parser.add_argument(
+            '--quarantine', default=settings.MEDIA_SWEEP_QUARANTINE,
+            help='Каталог карантина.',
+        )
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Удалять сирот, а не переносить в карантин.',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать обход заново, забыв сохраненный курсор.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, ничего не меняя.',
+        )
+
+    def load_cursor(self, options):
+        if options['restart']:
+            return ()
+        try:
+            with open(options['state_file']) as state:
+                cursor = json.load(state)['cursor']
+        except (OSError, ValueError, KeyError):
+            return ()
+        return tuple(cursor.split('/')) if cursor else ()
+
+    def save_cursor(self, options, cursor):
+        if options['dry_run']:
+            return
+        temporary = options['state_file'] + '.tmp'
+        with open(temporary, 'w') as state:
+            json.dump({'cursor': '/'.join(cursor)}, state)
+        os.replace(temporary, options['state_file'])
+
+    def release(self, options, path, name):
+        if options['delete']:
+            os.remove(path)
+            return
+        target = os.path.join(options['quarantine'], name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+    def scan(self, options, cursor):
+        """Файлы оригиналов и миниатюр от курсора, пачками."""
+        root = settings.MEDIA_ROOT
+        files = (item for top in sorted(set(tops()))
+                 for item in walk(root, (top,), cursor))
+        if options['limit']:
+            files = islice(files, options['limit'])
+        batch = list(islice(files, options['batch_size']))
+        while batch:
+            yield batch
+            batch = list(islice(files, options['batch_size']))
+
+    def orphans(self, batch, fresh_after):
+        """Пары (имя, путь) файлов пачки, на которые никто не ссылается
+        и которые старше fresh_after."""
+        originals, thumbnails = tops()
+        names = {'/'.join(parts): entry for parts, entry in batch}
+        live = (
+            live_originals([name for name in names
+                            if name.startswith(originals + '/')])
+            | live_thumbnails([name for name in names
+                               if name.startswith(thumbnails + '/')])
+        )
+        for name, entry in names.items():
+            if name in live:
+                continue
+            try:
+                if os.stat(entry.path).st_mtime > fresh_after:
+                    continue
+            except FileNotFoundError:
+                continue
+            yield name, entry.path
+
+    def with_thumbnails(self, options, orphans):
+        """Сироты и миниатюры осиротевших оригиналов.
+
+        Записи sorl о миниатюрах оригинала сами не исчезнут, и
+        миниатюры по ним считались бы живыми вечно: они убираются
+        вместе с оригиналом, а записи стираются.
+        """
+        originals = tops()[0] + '/'
+        for name, path in orphans:
+            if name.startswith(originals):
+                image_file, thumbnails = thumbnails_of(name)
+                yield from thumbnails
+                if not options['dry_run']:
+                    delete(image_file, delete_file=False)
+            yield name, path
+
+    def sweep(self, options, orphans):
+        """Убирает сирот; возвращает их число."""
+        count = 0
+        for name, path in self.with_thumbnails(options, orphans):
+            count += 1
+            if not options['dry_run']:
+                try:
+                    self.release(options, path, name)
+                except FileNotFoundError:
+                    # Файл успели убрать между проверкой и переносом.
+                    pass
+        return count
+
+    def handle(self, *args, **options):
+        checked = orphans = 0
+        fresh_after = time.time() - options['min_age']
+        for batch in self.scan(options, self.load_cursor(options)):
+            started = time.monotonic()
+            orphans += self.sweep(
+                options, self.orphans(batch, fresh_after))
+            checked += len(batch)
+            self.save_cursor(options, batch[-1][0])
+            if options['rate'] > 0:
+                # Ограничиваем скорость, чтобы не забить диск живого узла.
+                pause = len(batch) / options['rate']
+                time.sleep(max(0, pause - (time.monotonic() - started)))
+
+        if not options['limit'] or checked < options['limit']:
+            # Обход дошел до конца: следующий запуск начнет сначала.
+            self.save_cursor(options, ())
+        if options['dry_run']:
+            action = 'найдено'
+        else:
+            action = 'удалено' if options['delete'] else 'в карантине'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено файлов: {checked}, сирот ({action}): {orphans}'))
@@ -0,0 +1,127 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from core.template_backend import DjangoTemplates
+from posts.forms import CommentForm, PostForm
+from posts.models import Post
+from posts.stats import get_stats
+from posts.utils import cursor_page, page_quan
+
+User = get_user_model()
+
+
+def create_backend(precompile):
+    """Бэкенд с настройками проекта, который грузит шаблоны с диска
+    на каждый запрос или держит их скомпилированными в памяти."""
+    params = {key: value for key, value in settings.TEMPLATES[0].items()
+              if key != 'BACKEND'}
+    params['NAME'] = 'precompiled' if precompile else 'default'
+    params['OPTIONS'] = {**params.get('OPTIONS', {}), 'debug': False}
+    if not precompile:
+        # Без явных loaders движок с debug=False сам включил бы кэш.
+        loaders = ['django.template.loaders.filesystem.Loader']
+        if params['APP_DIRS']:
+            loaders.append('django.template.loaders.app_directories.Loader')
+        params['APP_DIRS'] = False
+        params['OPTIONS']['loaders'] = loaders
+    with override_settings(TEMPLATE_PRECOMPILE=precompile):
+        backend = DjangoTemplates(params)
+    if precompile:
+        backend.precompile()
+    return backend
+
+
+def measure(backend, name, context, request, repeat):
+    """Среднее время get_template и render, как в render() из
+    представления, в миллисекундах."""
+    # Первая отрисовка прогревает кэши: фрагменты, миниатюры, URL.
+    backend.get_template(name).render(context, request)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        backend.get_template(name).render(context, request)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+class Command(BaseCommand):
+    help = ('Отрисовывает каждый шаблон posts со страницей из '
+            'PAGE_QUANTITY постов и сравнивает время с загрузкой шаблонов '
+            'с диска и с предкомпилированными шаблонами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Сколько раз отрисовать каждый шаблон.',
+        )
+        parser.add_argument(
+            '--username',
+            help='От чьего имени отрисовывать; по умолчанию — автор '
+                 'самого нового поста.',
+        )
+        parser.add_argument(
+            '--template', action='append',
+            help='Имя шаблона; по умолчанию все шаблоны posts/.',
+        )
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('author', 'group').first()
+        if post is None:
+            raise CommandError(
+                'Постов нет: заполните базу командой generate_data.')
+        if options['username']:
+            user = User.objects.filter(
+                username=options['username']).first()
+            if user is None:
+                raise CommandError(
+                    f'Пользователя {options["username"]} нет.')
+        else:
+            user = post.author
+        request = RequestFactory().get('/')
+        request.user = user
+
+        posts = Post.objects.select_related('author', 'group')
+        context = {
+            'page_obj': page_quan(posts, request)['page_object'],
+            'post': post,
+            'author': post.author,
+            'group': post.group,
+            'post_count': get_stats(post.author).posts_count,
+            'comments': cursor_page(
+                post.comments.select_related('author'), request,
+                settings.COMMENT_PAGE_QUANTITY, field='created'),
+            'form': CommentForm(),
+            'following': False,
+            'sub': post.author != user,
+            'query': ' '.join(post.text.split()[:2]),
+            'scope': 'posts',
+            'index': True,
+        }
+        overrides = {
+            'posts/create.html': {'form': PostForm()},
+            'posts/follow.html': {'index': False, 'follow': True},
+        }
+
+        backends = [create_backend(False), create_backend(True)]
+        names = options['template'] or [
+            name for name in backends[1].template_names()
+            if name.startswith('posts/')]
+        repeat = options['repeat']
+        totals = [0.0, 0.0]
+        for name in names:
+            data = {**context, **overrides.get(name, {})}
+            results = [measure(backend, name, data, request, repeat)
+                       for backend in backends]
+            totals = [total + result
+                      for total, result in zip(totals, results)]
+            self.stdout.write(
+                f'{name}: с диска {results[0]:.2f} мс, '
+                f'предкомпилированный {results[1]:.2f} мс '
+                f'(x{results[0] / results[1]:.1f})')
+        self.stdout.write(
+            f'Всего: с диска {totals[0]:.2f} мс, '
+            f'предкомпилированные {totals[1]:.2f} мс '
+            f'(x{totals[0] / totals[1]:.1f})')
@@ -0,0 +1,11 @@
+"""Словарь синтетических текстов: из него generate_data собирает посты,
+а load_test берет поисковые запросы, которые что-то находят."""
+
+WORDS = (
+    'день утро вечер ночь дом город река лес поле дорога письмо книга '
+    'работа служба друг брат сестра отец мать время жизнь мысль слово '
+    'война мир правда счастье любовь дело земля небо море весна лето '
+    'осень зима сад окно чай обед ужин музыка песня театр роман дневник '
+    'сегодня вчера завтра снова опять очень долго тихо хорошо плохо '
+    'читал писал думал видел ехал гулял работал спал ждал знал'
+).split()
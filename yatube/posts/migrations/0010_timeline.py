@@ -0,0 +1,55 @@
+# Generated by Django 2.2.19 on 2026-10-18 02:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_timelines(apps, schema_editor):
+    """Наполняет ленты читателей, подписанных до появления Timeline:
+    иначе их лента подписок окажется пустой до rebuild_timelines."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    Timeline = apps.get_model('posts', 'Timeline')
+    user_ids = list(Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True).distinct())
+    for user_id in user_ids:
+        authors = Follow.objects.filter(user_id=user_id).values('author_id')
+        posts = Post.objects.filter(author_id__in=authors).order_by(
+            '-pub_date').values_list('id', 'pub_date')
+        Timeline.objects.bulk_create(
+            Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts[:settings.TIMELINE_LENGTH])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_auto_20220206_0234'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Timeline',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='читатель')),
+            ],
+            options={
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timeline',
+            index=models.Index(fields=['user', '-pub_date'], name='timeline_user_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timeline',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique-timeline-post'),
+        ),
+        migrations.RunPython(
+            backfill_timelines, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.19 on 2026-10-18 02:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='постов')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='комментариев')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='подписок')),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from posts import search
+
+
+def install(apps, schema_editor):
+    search.install(schema_editor.connection.alias)
+    if search.is_supported(schema_editor.connection.alias):
+        search.rebuild(schema_editor.connection.alias)
+
+
+def uninstall(apps, schema_editor):
+    search.uninstall(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
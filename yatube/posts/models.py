@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -13,13 +15,31 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class CountedModel(models.Model):
+    """Модель, от записей которой зависят счетчики AuthorStats.
+
+    Приемники post_save обновляют счетчики в той же транзакции, что и
+    сама запись: если обновление упадет, откатится и запись. Удаление
+    Collector и так выполняет в транзакции вместе с post_delete.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class Post(CountedModel):
     text = models.TextField(
         verbose_name='текст поста',
         help_text='Введите текст поста'
     )
     pub_date = models.DateTimeField(auto_now_add=True,
                                     verbose_name='дата публикации')
+    updated = models.DateTimeField(auto_now=True,
+                                   verbose_name='дата изменения')
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -38,17 +58,26 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentAddressedStorage(),
+        blank=True,
+        db_index=True
     )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = (
+            models.Index(fields=('-pub_date',), name='post_date_idx'),
+            models.Index(fields=('author', '-pub_date'),
+                         name='post_author_date_idx'),
+            models.Index(fields=('group', '-pub_date'),
+                         name='post_group_date_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
 
 
-class Comment(models.Model):
+class Comment(CountedModel):
     post = models.ForeignKey(
         Post,
         related_name='comments',
@@ -70,12 +99,18 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = (
+            # id в индексе отдает страницы по курсору (created, id)
+            # без сортировки
+            models.Index(fields=('post', '-created', '-id'),
+                         name='comment_post_created_id_idx'),
+        )
 
     def __str__(self):
         return self.text
 
 
-class Follow(models.Model):
+class Follow(CountedModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -90,7 +125,59 @@ class Follow(models.Model):
     )
 
     class Meta:
+        indexes = (
+            models.Index(fields=('author', 'user'),
+                         name='follow_author_user_idx'),
+        )
         constraints = (
             models.UniqueConstraint(fields=('user', 'author',),
                                     name='unique-in-module'),
         )
+
+
+class Timeline(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='пост'
+    )
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = (
+            models.Index(fields=('user', '-pub_date'),
+                         name='timeline_user_date_idx'),
+        )
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post',),
+                                    name='unique-timeline-post'),
+        )
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='автор'
+    )
+    posts_count = models.PositiveIntegerField(default=0,
+                                              verbose_name='постов')
+    comments_count = models.PositiveIntegerField(
+        default=0, verbose_name='комментариев')
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='подписок')
+
+    def __str__(self):
+        return f'{self.author_id}: {self.posts_count}'
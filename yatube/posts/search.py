@@ -0,0 +1,161 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Max
+
+from .feed_cache import get_generation
+from .utils import CursorPage, cursor_page, decode_cursor
+
+# индекс FTS5 -> таблица, текст которой он индексирует
+INDEXES = {
+    'posts_post_fts': 'posts_post',
+    'posts_comment_fts': 'posts_comment',
+}
+# сколько слов запроса учитывать: длинные запросы дороги и бесполезны
+MAX_WORDS = 8
+
+
+def _schema(index, table):
+    # Внешний контент: индекс хранит только словарь, текст остается
+    # в таблице модели, а триггеры держат их в согласии.
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+        f"text, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_insert "
+        f"AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_delete "
+        f"AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_update "
+        f"AFTER UPDATE OF text ON {table} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f"INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+    ]
+
+
+def is_supported(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def install(using='default'):
+    """Создает индексы и триггеры; повторный вызов ничего не меняет."""
+    if not is_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        for index, table in INDEXES.items():
+            for statement in _schema(index, table):
+                cursor.execute(statement)
+
+
+def drop_triggers(using='default'):
+    """Отключает обновление индексов при записи.
+
+    Массовой загрузке дешевле вставить строки без триггеров, а потом
+    вызвать install() и rebuild(), чем индексировать каждую строку.
+    """
+    if not is_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        for index in INDEXES:
+            for suffix in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {index}_{suffix}')
+
+
+def uninstall(using='default'):
+    if not is_supported(using):
+        return
+    drop_triggers(using)
+    with connections[using].cursor() as cursor:
+        for index in INDEXES:
+            cursor.execute(f'DROP TABLE IF EXISTS {index}')
+
+
+def restore_triggers(sender, using='default', **kwargs):
+    """Обработчик post_migrate.
+
+    Миграции SQLite пересоздают таблицу при изменении полей модели,
+    и триггеры старой таблицы пропадают вместе с ней. Сам индекс
+    остается верным: id и текст строк при копировании не меняются.
+    """
+    if is_supported(using) and set(INDEXES) <= set(
+            connections[using].introspection.table_names()):
+        install(using)
+
+
+def rebuild(using='default'):
+    """Переиндексирует таблицы целиком и сжимает индексы."""
+    with connections[using].cursor() as cursor:
+        for index in INDEXES:
+            cursor.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+            cursor.execute(
+                f"INSERT INTO {index}({index}) VALUES ('optimize')")
+
+
+def match_expression(query):
+    """Запрос FTS5 из ввода пользователя: все слова обязательны,
+    последнее ищется как префикс (поиск по мере набора)."""
+    words = re.findall(r'\w+', query.lower())[:MAX_WORDS]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def find(queryset, query, request, per_page, field='pub_date'):
+    """Страница объектов queryset, текст которых подходит под запрос.
+
+    На SQLite по bm25 ранжируются SEARCH_RANK_WINDOW самых новых
+    совпадений, страницы листаются курсором ?after= по паре (рейтинг,
+    id). bm25 считает частоту каждого слова по всему индексу, поэтому
+    id и рейтинги страницы кэшируются до смены поколения лент.
+    На других базах поиск сводится к icontains с курсором по field.
+    """
+    match = match_expression(query)
+    if match is None:
+        return CursorPage([], False, False, field)
+    if not is_supported(queryset.db):
+        return cursor_page(queryset.filter(text__icontains=query.strip()),
+                           request, per_page, field)
+
+    index = f'{queryset.model._meta.db_table}_fts'
+    token = request.GET.get('after', '')
+    after = decode_cursor(token, parse=float)
+    # Новые комментарии не меняют поколение лент, поэтому в ключе
+    # еще и последний id таблицы.
+    latest = queryset.model.objects.using(queryset.db).aggregate(
+        latest=Max('pk'))['latest']
+    key = 'search:{}:{}:{}:{}'.format(
+        get_generation(), index, latest, hashlib.md5(
+            f'{match}|{token}|{per_page}'.encode()).hexdigest())
+    rows = cache.get(key)
+    if rows is None:
+        sql = (
+            f'SELECT id, rank FROM (SELECT rowid AS id, rank FROM {index} '
+            f'WHERE {index} MATCH %s ORDER BY rowid DESC '
+            f'LIMIT {int(settings.SEARCH_RANK_WINDOW)})'
+        )
+        params = [match]
+        if after is not None:
+            sql += ' WHERE rank > %s OR (rank = %s AND id > %s)'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY rank, id LIMIT %s'
+        params.append(per_page + 1)
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        cache.set(key, rows, settings.FEED_CACHE_TIMEOUT)
+
+    objects = queryset.in_bulk([pk for pk, _ in rows[:per_page]])
+    page = []
+    for pk, rank in rows[:per_page]:
+        if pk in objects:
+            objects[pk].search_rank = rank
+            page.append(objects[pk])
+    return CursorPage(page, len(rows) > per_page, after is not None,
+                      'search_rank')
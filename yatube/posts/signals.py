@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import conditional, follow_graph, stats, thumbnails, timeline
+from .feed_cache import bump_generation, now_and_on_commit
+from .models import Comment, Follow, Group, Post, User
+
+# поля пользователя, которые видны в лентах
+FEED_USER_FIELDS = frozenset(('username', 'first_name', 'last_name'))
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        'image', flat=True).first()
+    if previous and previous != instance.image.name:
+        instance._replaced_image = previous
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    thumbnails.schedule(instance.image)
+    thumbnails.schedule_release(instance.__dict__.pop('_replaced_image', None))
+    if created:
+        stats.increment(instance.author_id, 'posts_count')
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, 'posts_count')
+    thumbnails.schedule_release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.increment(instance.author_id, 'comments_count')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, 'comments_count')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comments_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        conditional.touch_post(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.increment(instance.author_id, 'followers_count')
+        stats.increment(instance.user_id, 'following_count')
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, 'followers_count')
+    stats.decrement(instance.user_id, 'following_count')
+    timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    follow_graph.changed(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def feed_changed(sender, raw=False, update_fields=None, **kwargs):
+    # Вход на сайт сохраняет last_login: ленты его не показывают,
+    # и сбрасывать из-за него все страницы незачем.
+    if sender is User and update_fields is not None and not (
+            FEED_USER_FIELDS & update_fields):
+        return
+    if not raw:
+        now_and_on_commit(bump_generation)
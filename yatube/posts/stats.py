@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Comment, Follow, Post
+
+# счетчик -> (модель, поле, по которому группируются строки)
+COUNTERS = {
+    'posts_count': (Post, 'author_id'),
+    'comments_count': (Comment, 'author_id'),
+    'followers_count': (Follow, 'author_id'),
+    'following_count': (Follow, 'user_id'),
+}
+
+
+def compute(author_ids):
+    """Считает все счетчики для пачки авторов за четыре GROUP BY."""
+    result = {author_id: dict.fromkeys(COUNTERS, 0)
+              for author_id in author_ids}
+    for counter, (model, field) in COUNTERS.items():
+        rows = model.objects.filter(
+            **{f'{field}__in': author_ids}
+        ).order_by().values(field).annotate(total=Count('pk'))
+        for row in rows:
+            result[row[field]][counter] = row['total']
+    return result
+
+
+def increment(author_id, counter):
+    with transaction.atomic():
+        updated = AuthorStats.objects.filter(author_id=author_id).update(
+            **{counter: F(counter) + 1})
+        if not updated:
+            AuthorStats.objects.get_or_create(
+                author_id=author_id, defaults=compute([author_id])[author_id])
+
+
+def decrement(author_id, counter):
+    # Строку не создаем: при каскадном удалении пользователя
+    # она бы сослалась на удаляемого автора.
+    AuthorStats.objects.filter(
+        author_id=author_id, **{f'{counter}__gt': 0}
+    ).update(**{counter: F(counter) - 1})
+
+
+def get_stats(author):
+    """Возвращает счетчики автора, при отсутствии досчитывает их."""
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            author_id=author.pk, defaults=compute([author.pk])[author.pk])
+        return stats
+
+
+def reconcile(author_ids):
+    """Сверяет счетчики пачки авторов с таблицами и чинит расхождения.
+
+    Возвращает число исправленных записей.
+    """
+    actual = compute(author_ids)
+    stored = AuthorStats.objects.in_bulk(author_ids)
+    missing, changed = [], []
+    for author_id, counters in actual.items():
+        stats = stored.get(author_id)
+        if stats is None:
+            missing.append(AuthorStats(author_id=author_id, **counters))
+            continue
+        if any(getattr(stats, name) != value
+               for name, value in counters.items()):
+            for name, value in counters.items():
+                setattr(stats, name, value)
+            changed.append(stats)
+    with transaction.atomic():
+        AuthorStats.objects.bulk_create(missing, ignore_conflicts=True)
+        AuthorStats.objects.bulk_update(changed, list(COUNTERS))
+    return len(missing) + len(changed)
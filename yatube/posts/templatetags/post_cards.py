@@ -0,0 +1,10 @@
+from django import template
+from django.conf import settings
+
+register = template.Library()
+
+
+@register.simple_tag
+def card_cache_timeout():
+    """Сколько секунд хранится отрисованная карточка поста."""
+    return settings.POST_CARD_CACHE_TIMEOUT
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.thumbnails import get_alias_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, alias):
+    """Миниатюра по псевдониму геометрии из THUMBNAIL_ALIASES."""
+    return get_alias_thumbnail(image, alias)
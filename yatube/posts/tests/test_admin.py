@@ -0,0 +1,96 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from posts.admin import DateProbeQuerySet
+from posts.models import Group, Post
+from posts.utils import EstimatedCountPaginator
+
+User = get_user_model()
+
+CHANGELIST = '/admin/posts/post/'
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.groups = [
+            Group.objects.create(title=f'Группа {number}',
+                                 slug=f'group-{number}',
+                                 description='Описание')
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def create_posts(self, count, **kwargs):
+        Post.objects.bulk_create(
+            Post(author=self.admin, group=self.groups[number % 5],
+                 text=f'Пост {number}', **kwargs)
+            for number in range(count))
+
+    def count_queries(self, url=CHANGELIST):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк."""
+        self.create_posts(3)
+        few = self.count_queries()
+        self.create_posts(30)
+        many = self.count_queries()
+        self.assertEqual(few, many)
+
+    @override_settings(ADMIN_COUNT_LIMIT=10)
+    def test_estimated_count(self):
+        """Без фильтров большая таблица не считается через COUNT(*)."""
+        self.create_posts(30)
+        queryset = Post.objects.all()
+        last_pk = Post.objects.latest('pk').pk
+        with self.assertNumQueries(2) as queries:
+            self.assertEqual(
+                EstimatedCountPaginator(queryset, 10).count, last_pk)
+        self.assertNotIn('COUNT', queries.captured_queries[-1]['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE posts_post')
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 30)
+        filtered = Post.objects.filter(group=self.groups[0])
+        self.assertEqual(EstimatedCountPaginator(filtered, 10).count, 6)
+        filtered = Post.objects.filter(text__startswith='Пост')
+        self.assertEqual(EstimatedCountPaginator(filtered, 10).count, 10)
+
+    def test_date_hierarchy_probes_index(self):
+        """date_hierarchy перебирает периоды запросами LIMIT 1."""
+        for year, month, day in ((2019, 5, 1), (2021, 2, 3),
+                                 (2021, 2, 28), (2021, 7, 9)):
+            post = Post.objects.create(author=self.admin, text='Пост')
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.make_aware(
+                    datetime.datetime(year, month, day, 12)))
+        queryset = DateProbeQuerySet(Post)
+        # Два года — три запроса: по одному на период и последний пустой.
+        with self.assertNumQueries(3):
+            years = queryset.dates('pub_date', 'year')
+        self.assertEqual([date.year for date in years], [2019, 2021])
+        months = queryset.filter(pub_date__year=2021).dates(
+            'pub_date', 'month', order='DESC')
+        self.assertEqual([date.month for date in months], [7, 2])
+        days = queryset.filter(pub_date__year=2021,
+                               pub_date__month=2).dates('pub_date', 'day')
+        self.assertEqual([date.day for date in days], [3, 28])
+        response = self.client.get(CHANGELIST + '?pub_date__year=2021')
+        self.assertContains(response, 'pub_date__month=7')
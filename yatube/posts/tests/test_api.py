@@ -0,0 +1,182 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for number in range(25):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}',
+                group=cls.group if number % 2 else None)
+        for number in range(3):
+            Post.objects.create(author=cls.other, text=f'Чужой {number}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.filter(author=cls.author).first()
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def get(self, url, **extra):
+        response = self.client.get(url, **extra)
+        if response.streaming:
+            response.data = json.loads(b''.join(response.streaming_content))
+        return response
+
+    def pages(self, url, limit):
+        """Все страницы ленты по курсорам next."""
+        results, cursor = [], None
+        while True:
+            query = f'?limit={limit}'
+            if cursor:
+                query += f'&after={cursor}'
+            data = self.get(url + query).data
+            self.assertLessEqual(len(data['results']), limit)
+            results += data['results']
+            cursor = data['next']
+            if cursor is None:
+                return results
+
+    def expected(self, queryset):
+        return list(queryset.order_by('-pub_date', '-pk').values_list(
+            'pk', flat=True))
+
+    def test_feeds_page_with_cursor(self):
+        """Курсоры проходят ленту целиком без пропусков и повторов."""
+        feeds = {
+            reverse('api:index'): Post.objects.all(),
+            reverse('api:group_posts', args=['group']):
+                Post.objects.filter(group=self.group),
+            reverse('api:profile', args=['author']):
+                Post.objects.filter(author=self.author),
+            reverse('api:follow_index'):
+                Post.objects.filter(author=self.author),
+        }
+        for url, queryset in feeds.items():
+            with self.subTest(url=url):
+                results = self.pages(url, 10)
+                self.assertEqual([post['id'] for post in results],
+                                 self.expected(queryset))
+
+    def test_post_payload(self):
+        """В посте только то, что показывает карточка."""
+        data = self.get(
+            reverse('api:profile', args=['author']) + '?limit=1').data
+        self.assertEqual(data['results'], [{
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat()[:23] + 'Z',
+            'author': {'username': 'author', 'full_name': 'Лев Толстой'},
+            'group': None,
+            'image': None,
+        }])
+        self.assertIsNotNone(data['next'])
+
+    def test_group_and_profile_headers(self):
+        group = self.get(reverse('api:group_posts', args=['group'])).data
+        self.assertEqual(group['group'], {
+            'slug': 'group', 'title': 'Группа', 'description': 'Описание'})
+        profile = self.get(reverse('api:profile', args=['author'])).data
+        self.assertEqual(profile['author'], {
+            'username': 'author', 'full_name': 'Лев Толстой',
+            'post_count': 25, 'following': True,
+        })
+
+    def test_follow_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_missing_objects(self):
+        for url in (reverse('api:group_posts', args=['missing']),
+                    reverse('api:profile', args=['missing']),
+                    reverse('api:post_detail', args=[10 ** 6])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_post_detail(self):
+        """Пост с числом постов автора и страницами комментариев."""
+        comments = [
+            Comment.objects.create(
+                post=self.post, author=self.reader, text=f'Ответ {number}')
+            for number in range(5)
+        ]
+        url = reverse('api:post_detail', args=[self.post.pk])
+        data = self.get(url + '?limit=3').data
+        self.assertEqual(data['post']['id'], self.post.pk)
+        self.assertEqual(data['post']['author']['post_count'], 25)
+        self.assertEqual(data['results'][0], {
+            'id': comments[-1].pk,
+            'text': 'Ответ 4',
+            'created': comments[-1].created.isoformat()[:23] + 'Z',
+            'author': {'username': 'reader'},
+        })
+        rest = self.get(url + f'?limit=3&after={data["next"]}').data
+        self.assertEqual(
+            [comment['id'] for comment in data['results'] + rest['results']],
+            [comment.pk for comment in reversed(comments)])
+        self.assertIsNone(rest['next'])
+
+    def test_not_modified(self):
+        """Повтор с If-None-Match получает 304, пока лента не менялась."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        # только сессия и пользователь, без запросов к ленте
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.logout()
+        anonymous = self.client.get(url)['ETag']
+        self.assertNotEqual(anonymous, etag)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(
+            self.client.get(url + '?limit=5')['ETag'], etag)
+        Post.objects.create(author=self.author, text='Новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_etag_follows_comments(self):
+        url = reverse('api:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Comment.objects.create(post=self.post, author=self.reader, text='Да')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_queries_do_not_grow_with_page(self):
+        """Страница из values() не делает запросов на каждую строку."""
+        url = reverse('api:index')
+        # сессия, пользователь и сама страница
+        with self.assertNumQueries(3):
+            self.get(url + '?limit=1')
+        with self.assertNumQueries(3):
+            self.get(url + '?limit=20')
+
+    @override_settings(API_PAGE_LIMIT=12)
+    def test_limit_is_capped(self):
+        for limit, expected in (('1000', 12), ('0', 1), ('x', 10)):
+            with self.subTest(limit=limit):
+                url = reverse('api:index') + f'?limit={limit}'
+                data = self.get(url).data
+                self.assertEqual(len(data['results']), expected)
@@ -0,0 +1,79 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+MORE = re.compile(r'data-more="([^"]+)"')
+
+
+@override_settings(COMMENT_PAGE_QUANTITY=4)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [User.objects.create_user(username=f'commentator{i}')
+                       for i in range(3)]
+        cls.post = Post.objects.create(author=cls.authors[0], text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.authors[i % 3],
+                text=f'Комментарий номер {i}.')
+            for i in range(10)
+        ]
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def test_post_detail_shows_first_page(self):
+        """На странице поста только самые новые комментарии."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        page = response.context['comments']
+        self.assertEqual([comment.pk for comment in page],
+                         [comment.pk for comment in self.comments[:-5:-1]])
+        self.assertContains(response, 'Показать еще')
+
+    def test_load_more_walks_all_comments(self):
+        """Порции «Показать еще» проходят все комментарии по разу."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        seen = [comment.pk for comment in response.context['comments']]
+        chunks = 0
+        match = MORE.search(response.content.decode())
+        while match:
+            response = self.client.get(match.group(1).replace('&amp;', '&'))
+            self.assertTemplateUsed(
+                response, 'posts/includes/comment_list.html')
+            self.assertNotContains(response, '<html')
+            seen += [comment.pk for comment in response.context['comments']]
+            chunks += 1
+            match = MORE.search(response.content.decode())
+        self.assertEqual(chunks, 2)
+        self.assertEqual(seen, [comment.pk for comment in self.comments[::-1]])
+
+    def test_fragment_queries(self):
+        """Порция — один запрос поста и один комментариев с авторами."""
+        url = reverse('posts:comments', args=[self.post.pk])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['comments']), 4)
+
+    def test_fragment_missing_post(self):
+        response = self.client.get(reverse('posts:comments', args=[10 ** 6]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_fragment_not_modified(self):
+        url = reverse('posts:comments', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(
+            post=self.post, author=self.authors[1], text='Новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
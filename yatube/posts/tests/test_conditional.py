@@ -0,0 +1,157 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        # Часы тестов идут от точки в будущем: время записей и
+        # Last-Modified задается явно.
+        self.now = int(time.time()) + 100
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def clock(self, seconds):
+        return mock.patch('time.time', return_value=self.now + seconds)
+
+    def get(self, url, seconds, **headers):
+        with self.clock(seconds):
+            return self.client.get(url, **headers)
+
+    def urls(self):
+        return (
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:profile', args=['author']),
+            reverse('posts:group_posts', args=['group']),
+        )
+
+    def assert_not_modified(self, response):
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.templates)
+
+    def assert_moves_last_modified(self, url, write):
+        self.get(url, 0)
+        modified = self.get(url, 1)['Last-Modified']
+        with self.clock(10):
+            write()
+        response = self.get(url, 20, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], http_date(self.now + 10))
+
+    def test_validators(self):
+        """Страницы отдают ETag и Last-Modified."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.get(url, 0)
+                response = self.get(url, 1)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('ETag', response)
+                self.assertEqual(response['Last-Modified'],
+                                 http_date(self.now))
+
+    def test_fresh_write_has_no_last_modified(self):
+        """В секунду записи Last-Modified не отдается: вторая запись в
+        ту же секунду его бы не сдвинула."""
+        with self.clock(0):
+            Post.objects.create(author=self.author, group=self.group,
+                                text='Новый пост')
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.get(url, 0)
+                self.assertIn('ETag', response)
+                self.assertNotIn('Last-Modified', response)
+                self.assertEqual(self.get(url, 1)['Last-Modified'],
+                                 http_date(self.now))
+
+    def test_if_none_match(self):
+        """Повтор с ETag получает 304 без запросов и шаблонов."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    self.assert_not_modified(
+                        self.client.get(url, HTTP_IF_NONE_MATCH=etag))
+
+    def test_if_modified_since(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.get(url, 0)
+                modified = self.get(url, 1)['Last-Modified']
+                self.assert_not_modified(
+                    self.get(url, 2, HTTP_IF_MODIFIED_SINCE=modified))
+
+    def test_comment_delete_moves_last_modified(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        self.assert_moves_last_modified(
+            reverse('posts:post_detail', args=[self.post.pk]),
+            comment.delete)
+
+    def test_unfollow_moves_last_modified(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assert_moves_last_modified(
+            reverse('posts:profile', args=['author']), follow.delete)
+
+    def test_rename_moves_last_modified(self):
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Лев'
+        self.assert_moves_last_modified(
+            reverse('posts:group_posts', args=['group']), author.save)
+
+    def test_new_post_changes_validators(self):
+        responses = {url: self.client.get(url) for url in self.urls()}
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Новый пост')
+        for url, previous in responses.items():
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=previous['ETag'])
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_changes_post_detail(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        previous = self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=previous['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+    def test_reader_and_follow_change_etag(self):
+        """Страница зависит от читателя и его подписок."""
+        url = reverse('posts:profile', args=['author'])
+        anonymous = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(etag, anonymous)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отписаться')
+
+    def test_missing_objects(self):
+        for url in (reverse('posts:post_detail', args=[10 ** 6]),
+                    reverse('posts:profile', args=['missing']),
+                    reverse('posts:group_posts', args=['missing'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,133 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from posts import dumps
+from posts.models import AuthorStats, Comment, Follow, Group, Post, Timeline
+
+User = get_user_model()
+
+PUBLISHED = timezone.make_aware(datetime.datetime(1854, 3, 14))
+
+
+class DumpTest(TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+
+    def tearDown(self):
+        super().tearDown()
+        os.remove(self.path)
+        cache.clear()
+
+    def write(self, objects):
+        with open(self.path, 'w', encoding='utf-8') as stream:
+            json.dump(objects, stream, ensure_ascii=False)
+
+    def snapshot(self):
+        # dumpdata, как и JSON-сериализатор Django, хранит время
+        # с точностью до миллисекунд.
+        rows = []
+        for model in (User, Group, Post, Comment, Follow):
+            for row in model.objects.order_by('pk').values():
+                rows.append({
+                    name: value.replace(
+                        microsecond=value.microsecond // 1000 * 1000)
+                    if isinstance(value, datetime.datetime) else value
+                    for name, value in row.items()
+                })
+        return rows
+
+    def test_iter_objects_reads_in_chunks(self):
+        """Элементы массива разбираются, даже если рвутся между кусками."""
+        objects = [{'pk': number, 'text': 'ё' * number, 'list': [1, {}]}
+                   for number in range(50)]
+        text = json.dumps(objects, ensure_ascii=False, indent=2)
+        self.assertEqual(
+            list(dumps.iter_objects(io.StringIO(text), chunk_size=7)),
+            objects)
+        self.assertEqual(list(dumps.iter_objects(io.StringIO(' [ ] '))), [])
+        for broken in ('{}', '[{"a": 1}', '[{"a": 1} {"b": 2}]'):
+            with self.assertRaises(ValueError):
+                list(dumps.iter_objects(io.StringIO(broken), chunk_size=4))
+
+    def test_import_resolves_order(self):
+        """Комментарий раньше поста и автора в файле не мешает загрузке,
+        даты из дампа сохраняются, производные данные пересчитаны."""
+        self.write([
+            {'model': 'posts.comment', 'pk': 7, 'fields': {
+                'post': 3, 'author': 2, 'text': 'Комментарий',
+                'created': '1854-03-15T00:00:00Z'}},
+            {'model': 'posts.follow', 'pk': 1, 'fields': {
+                'user': 2, 'author': 1}},
+            {'model': 'posts.post', 'pk': 3, 'fields': {
+                'text': 'Дневник', 'pub_date': '1854-03-14T00:00:00Z',
+                'author': 1, 'group': 5, 'image': ''}},
+            {'model': 'sessions.session', 'pk': 'key', 'fields': {}},
+            {'model': 'posts.group', 'pk': 5, 'fields': {
+                'title': 'Дневники', 'slug': 'diaries',
+                'description': ''}},
+            {'model': 'auth.user', 'pk': 1, 'fields': {
+                'username': 'leo', 'password': '', 'groups': [],
+                'user_permissions': [],
+                'date_joined': '1854-01-01T00:00:00Z'}},
+            {'model': 'auth.user', 'pk': 2, 'fields': {
+                'username': 'sonya', 'password': '',
+                'date_joined': '1854-01-01T00:00:00Z'}},
+        ])
+        out = StringIO()
+        call_command('import_dump', self.path, batch_size=1, stdout=out)
+        self.assertIn('Загружено объектов: 6', out.getvalue())
+        post = Post.objects.get(pk=3)
+        self.assertEqual(post.pub_date, PUBLISHED)
+        self.assertEqual(post.group.slug, 'diaries')
+        self.assertIsNotNone(post.updated)
+        self.assertEqual(Comment.objects.get(pk=7).post, post)
+        self.assertTrue(Follow.objects.filter(user_id=2, author_id=1))
+        self.assertTrue(Timeline.objects.filter(user_id=2, post=post))
+        self.assertEqual(AuthorStats.objects.get(author_id=1).posts_count, 1)
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка обратно дают те же строки."""
+        author = User.objects.create_user(username='leo')
+        reader = User.objects.create_user(username='sonya')
+        group = Group.objects.create(title='Дневники', slug='diaries',
+                                     description='')
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        Post.objects.filter(pk=post.pk).update(pub_date=PUBLISHED)
+        Comment.objects.create(post=post, author=reader, text='Ответ')
+        Follow.objects.create(user=reader, author=author)
+        with open(self.path, 'w', encoding='utf-8') as stream:
+            # По запросу на модель и по одному на связи пользователей.
+            with self.assertNumQueries(len(dumps.MODELS) + 2):
+                count = dumps.dump(stream)
+        self.assertEqual(count, 6)
+        snapshot = self.snapshot()
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        self.assertEqual(dumps.load(self.path, batch_size=2), {
+            'auth.user': 2, 'posts.group': 1, 'posts.post': 1,
+            'posts.comment': 1, 'posts.follow': 1,
+        })
+        self.assertEqual(snapshot, self.snapshot())
+
+    def test_repository_dump(self):
+        """dump.json из репозитория загружается целиком."""
+        path = os.path.join(settings.BASE_DIR, 'dump.json')
+        with open(path, encoding='utf-8') as stream:
+            expected = {}
+            for obj in json.load(stream):
+                expected[obj['model']] = expected.get(obj['model'], 0) + 1
+        loaded = dumps.load(path)
+        for label, count in loaded.items():
+            self.assertEqual(count, expected.get(label, 0))
+        self.assertEqual(Post.objects.count(), expected['posts.post'])
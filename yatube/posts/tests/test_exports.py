@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts import exports
+from posts.models import Comment, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_PREGENERATE=False)
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост, "{number}"')
+            for number in range(7)
+        ]
+        # Две одинаковые картинки хранилище кладет в один файл.
+        for post in cls.posts[:2]:
+            post.image = SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif')
+            post.save()
+        cls.foreign = Post.objects.create(author=cls.other, text='Чужой')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.foreign, author=cls.author, text=f'Ответ {number}')
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.other, text='Чужой ответ')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def expected_ids(self):
+        return ([('post', post.pk) for post in self.posts]
+                + [('comment', comment.pk) for comment in self.comments])
+
+    def test_ndjson(self):
+        """Выгружено все, что написал автор, и только это."""
+        content = b''.join(exports.export(self.author, chunk_size=3))
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([(row['type'], row['id']) for row in rows],
+                         self.expected_ids())
+        self.assertEqual(rows[0]['text'], self.posts[0].text)
+        self.assertEqual(rows[0]['image'], self.posts[0].image.name)
+        self.assertEqual(rows[-1]['post'], self.foreign.pk)
+
+    def test_csv(self):
+        content = b''.join(exports.export(self.author, 'csv', chunk_size=3))
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual([(row['type'], int(row['id'])) for row in rows],
+                         self.expected_ids())
+        self.assertEqual(rows[1]['text'], self.posts[1].text)
+        self.assertEqual(rows[2]['image'], '')
+
+    def test_queries_are_chunked(self):
+        """Строки читаются пачками по ключу."""
+        with self.assertNumQueries(3 + 2):
+            list(exports.export(self.author, chunk_size=3))
+
+    def test_zip_with_images(self):
+        content = b''.join(exports.export(self.author, images=True))
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        image = self.posts[0].image.name
+        self.assertEqual(archive.namelist(), ['author.ndjson', image])
+        self.assertEqual(archive.read(image), SMALL_GIF)
+        self.assertEqual(len(archive.read('author.ndjson').splitlines()),
+                         len(self.expected_ids()))
+
+    def test_missing_image_file_is_skipped(self):
+        path = os.path.join(TEMP_MEDIA_ROOT, self.posts[0].image.name)
+        os.rename(path, path + '.moved')
+        self.addCleanup(os.rename, path + '.moved', path)
+        content = b''.join(exports.export(self.author, images=True))
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertEqual(archive.namelist(), ['author.ndjson'])
+
+    def test_view(self):
+        response = self.client.get(reverse('posts:export') + '?format=csv')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="author.csv"')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), len(self.expected_ids()) + 1)
+
+    def test_view_zip(self):
+        response = self.client.get(reverse('posts:export') + '?images=1')
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn('author.ndjson', archive.namelist())
+
+    def test_view_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.zip')
+            call_command('export_author', 'author', path, images=True,
+                         format='csv', chunk_size=2)
+            with zipfile.ZipFile(path) as archive:
+                self.assertEqual(
+                    archive.namelist(),
+                    ['author.csv', self.posts[0].image.name])
+        with self.assertRaises(CommandError):
+            call_command('export_author', 'missing', os.devnull)
@@ -0,0 +1,114 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import follow_graph
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(8)]
+        for author in cls.authors[5::-2]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def followed(self):
+        return sorted(author.pk for author in self.authors[1:6:2])
+
+    def test_followees_are_sorted_and_cached(self):
+        """Массив грузится одним запросом и дальше берется из кэша."""
+        with self.assertNumQueries(1):
+            ids = follow_graph.followees(self.reader.pk)
+        self.assertEqual(ids.typecode, 'I')
+        self.assertEqual(list(ids), self.followed())
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                list(follow_graph.followees(self.reader.pk)), self.followed())
+
+    def test_checks_cost_no_queries(self):
+        """Проверки для целой страницы авторов не ходят в базу."""
+        follow_graph.followees(self.reader.pk)
+        author_ids = [author.pk for author in self.authors]
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                follow_graph.following(self.reader.pk, author_ids),
+                set(self.followed()))
+            self.assertTrue(follow_graph.is_following(
+                self.reader.pk, self.authors[1].pk))
+            self.assertFalse(follow_graph.is_following(
+                self.reader.pk, self.authors[0].pk))
+            self.assertFalse(follow_graph.is_following(
+                None, self.authors[1].pk))
+            self.assertEqual(
+                follow_graph.following(None, author_ids), set())
+
+    def test_follow_writes_update_index(self):
+        author = self.authors[0]
+        self.assertFalse(
+            follow_graph.is_following(self.reader.pk, author.pk))
+        self.client.get(reverse('posts:profile_follow', args=[author]))
+        self.assertTrue(
+            follow_graph.is_following(self.reader.pk, author.pk))
+        self.client.get(reverse('posts:profile_unfollow', args=[author]))
+        self.assertFalse(
+            follow_graph.is_following(self.reader.pk, author.pk))
+
+    def test_cascade_delete_updates_index(self):
+        author_id = self.authors[1].pk
+        self.assertTrue(follow_graph.is_following(self.reader.pk, author_id))
+        User.objects.get(pk=author_id).delete()
+        self.assertFalse(
+            follow_graph.is_following(self.reader.pk, author_id))
+
+    def test_invalidate_all_after_bulk_writes(self):
+        """Массовая загрузка без сигналов сбрасывает индекс целиком."""
+        follow_graph.followees(self.reader.pk)
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.authors[0])])
+        follow_graph.invalidate_all()
+        self.assertTrue(
+            follow_graph.is_following(self.reader.pk, self.authors[0].pk))
+
+    def test_index_expires(self):
+        """Подписка, записанная в обход сигналов, видна после TTL."""
+        follow_graph.followees(self.reader.pk)
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.authors[0])])
+        self.assertFalse(follow_graph.is_following(
+            self.reader.pk, self.authors[0].pk))
+        later = time.time() + settings.FOLLOW_GRAPH_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertTrue(follow_graph.is_following(
+                self.reader.pk, self.authors[0].pk))
+
+    def test_profile_uses_index(self):
+        """Страница профиля не спрашивает базу о подписке."""
+        author = self.authors[1]
+        Post.objects.create(author=author, text='Пост')
+        follow_graph.followees(self.reader.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:profile', args=[author]))
+        self.assertTrue(response.context['following'])
+        self.assertFalse([query for query in queries
+                          if 'posts_follow' in query['sql']])
@@ -0,0 +1,111 @@
+from collections import Counter
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from posts import follow_graph
+from posts.models import AuthorStats, Comment, Follow, Group, Post, Timeline
+
+User = get_user_model()
+
+OPTIONS = {'users': 50, 'groups': 3, 'posts': 400, 'comments': 300,
+           'follows': 200, 'batch_size': 70, 'seed': 7}
+
+
+class GenerateDataTest(TestCase):
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def generate(self, **options):
+        call_command('generate_data', stdout=StringIO(),
+                     **{**OPTIONS, **options})
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'author__username', 'group__slug', 'text', 'pub_date')),
+            list(Comment.objects.order_by('pk').values_list(
+                'post__text', 'author__username', 'text', 'created')),
+            list(Follow.objects.order_by('pk').values_list(
+                'user__username', 'author__username')),
+        )
+
+    def test_counts_and_derived_data(self):
+        """Создается заказанное число строк, ленты и счетчики готовы."""
+        self.generate()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 400)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(Follow.objects.count(), 200)
+        self.assertFalse(Follow.objects.filter(user=F('author')))
+        self.assertTrue(Timeline.objects.exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            400)
+        self.assertTrue(self.client.login(username='user0',
+                                          password='password'))
+
+    def test_search_index_is_rebuilt(self):
+        """Поиск находит сгенерированные посты, а триггеры индекса
+        возвращаются на место."""
+        self.generate()
+        response = self.client.get(reverse('posts:search'), {'q': 'день'})
+        self.assertTrue(response.context['page_obj'])
+        post = Post.objects.create(author=User.objects.first(),
+                                   text='Бегемот')
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': 'бегемот'})
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_dates_follow_ids(self):
+        """Даты постов заданы генератором и растут вместе с id."""
+        self.generate()
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True))
+        self.assertEqual(dates, sorted(dates))
+        for comment in Comment.objects.select_related('post')[:50]:
+            self.assertGreaterEqual(comment.created, comment.post.pub_date)
+
+    def test_distribution_is_skewed(self):
+        """Немногие авторы пишут большую часть постов."""
+        self.generate()
+        counts = sorted(Counter(Post.objects.values_list(
+            'author_id', flat=True)).values(), reverse=True)
+        self.assertGreater(sum(counts[:5]), 400 / 2)
+
+    def test_seed_is_deterministic(self):
+        """Один seed дает те же данные, другой — другие."""
+        self.generate()
+        first = self.snapshot()
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+        self.generate(seed=8, prefix='other')
+        texts = [text for _, _, text, _ in self.snapshot()[0]]
+        self.assertNotEqual(texts[400:], texts[:400])
+
+    def test_follow_index_is_invalidated(self):
+        """Подписки, вставленные в обход сигналов, видны индексу
+        подписок в кэше."""
+        last_pk = User.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        for user_id in range(last_pk + 1, last_pk + 1 + OPTIONS['users']):
+            follow_graph.followees(user_id)
+        self.generate()
+        for user_id, author_id in Follow.objects.values_list(
+                'user_id', 'author_id'):
+            self.assertTrue(follow_graph.is_following(user_id, author_id))
+
+    def test_prefix_must_be_new(self):
+        """Повторный запуск с тем же префиксом отказывается."""
+        self.generate(posts=0, comments=0, follows=0)
+        with self.assertRaises(CommandError):
+            self.generate()
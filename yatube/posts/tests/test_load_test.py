@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase, SimpleTestCase
+from posts.management.commands.load_test import MIX, percentile
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='author')
+        for number in range(2):
+            User.objects.create_user(username=f'user{number}',
+                                     password='password')
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='')
+        for number in range(5):
+            Post.objects.create(author=author, group=group,
+                                text=f'Пост про день {number}')
+        self.own = Post.objects.create(
+            author=User.objects.get(username='user0'), group=group,
+            text='Свой пост')
+        handle, self.output = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+
+    def tearDown(self):
+        super().tearDown()
+        os.remove(self.output)
+        cache.clear()
+
+    def test_every_route_answers(self):
+        """Прогон проходит по всем маршрутам без ошибок и сохраняет
+        отчет в JSON."""
+        out = StringIO()
+        # Потоки тестового сервера делят одну базу SQLite в памяти,
+        # и параллельные записи в ней упираются в блокировку таблиц.
+        call_command(
+            'load_test', url=self.live_server_url, requests=300,
+            duration=60, concurrency=1, output=self.output,
+            mix=['post_create=5', 'profile_unfollow=10'], stdout=out)
+        with open(self.output, encoding='utf-8') as stream:
+            report = json.load(stream)
+        self.assertEqual(report['total']['requests'], 300)
+        self.assertEqual(report['total']['errors'], 0,
+                         report['routes'])
+        routes = {route.replace('[auth]', '') for route in report['routes']}
+        self.assertEqual(routes, set(MIX))
+        summary = report['routes']['index']
+        self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+        self.assertIn('всего', out.getvalue())
+        self.assertTrue(Post.objects.filter(text='Нагрузочный пост'))
+        # Правка сохраняет свой пост, не меняя его текст и группу.
+        edited = Post.objects.get(pk=self.own.pk)
+        self.assertGreater(edited.updated, self.own.updated)
+        self.assertEqual((edited.text, edited.group_id),
+                         (self.own.text, self.own.group_id))
+        self.assertTrue(Comment.objects.exists())
+        self.assertTrue(Follow.objects.exists())
+
+    def test_unknown_route_in_mix(self):
+        with self.assertRaises(CommandError):
+            call_command('load_test', url=self.live_server_url,
+                         mix=['nowhere=1'])
+
+
+class PercentileTest(SimpleTestCase):
+    def test_nearest_rank(self):
+        """Перцентиль берется по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов страницы не зависит от числа постов и комментариев."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(12)]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        for i in range(120):
+            cls.post = Post.objects.create(
+                author=cls.authors[i % len(cls.authors)],
+                group=cls.group,
+                text=f'Пост {i}',
+            )
+        for i in range(150):
+            Comment.objects.create(
+                author=cls.authors[i % len(cls.authors)],
+                post=cls.post,
+                text=f'Комментарий {i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def assert_budget(self, client, url, budget):
+        with self.assertNumQueries(budget):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_index(self):
+        self.assert_budget(self.client, reverse('posts:index'), 2)
+
+    def test_group_posts(self):
+        self.assert_budget(self.client, reverse(
+            'posts:group_posts', kwargs={'slug': self.group.slug}), 3)
+
+    def test_profile(self):
+        self.assert_budget(self.client, reverse(
+            'posts:profile', kwargs={'username': 'author0'}), 4)
+
+    def test_post_detail(self):
+        self.assert_budget(self.client, reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}), 2)
+
+    def test_follow_index(self):
+        # сессия и пользователь + COUNT(*) и страница ленты
+        self.assert_budget(self.authorized_client,
+                           reverse('posts:follow_index'), 4)
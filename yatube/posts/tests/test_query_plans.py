@@ -0,0 +1,71 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# SCAN без индекса означает полный просмотр таблицы
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            Comment.objects.create(
+                author=cls.user, post=cls.post, text=f'Коммент {i}')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_views_use_indexes(self):
+        """Запросы лент не сканируют таблицы целиком и не сортируют."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(url)
+                selects = [query['sql'] for query in queries
+                           if query['sql'].startswith('SELECT')]
+                self.assertTrue(selects)
+                for sql in selects:
+                    for step in self.explain(sql):
+                        self.assertNotRegex(step, FULL_SCAN, sql)
+                        self.assertNotIn('TEMP B-TREE', step, sql)
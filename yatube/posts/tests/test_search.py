@@ -0,0 +1,115 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from posts import search
+from posts.models import Comment, Post
+from yatube.settings import PAGE_QUANTITY
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.strong = Post.objects.create(
+            author=cls.user, text='Ежик, ежик в тумане, снова ежик')
+        cls.weak = Post.objects.create(
+            author=cls.user, text='Длинный рассказ про лошадь, реку, '
+                                  'туман, сову и одного ёжика')
+        cls.other = Post.objects.create(author=cls.user, text='Про котов')
+        Comment.objects.create(
+            post=cls.other, author=cls.user, text='А где же ёжики?')
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_ranked_results(self):
+        """Поиск находит посты по словам и ставит выше релевантные."""
+        self.assertEqual(self.search('еж'), [self.strong])
+        self.assertEqual(self.search('ЕЖИК туман'), [self.strong])
+        self.assertEqual(self.search('туман'), [self.strong, self.weak])
+        self.assertEqual(self.search('кот'), [self.other])
+        self.assertEqual(self.search('жираф'), [])
+        self.assertEqual(self.search('"*'), [])
+
+    def test_comments_scope(self):
+        """В режиме ?in=comments ищутся комментарии."""
+        comments = self.search('ёжики', **{'in': 'comments'})
+        self.assertEqual([comment.post for comment in comments],
+                         [self.other])
+
+    def test_index_follows_writes(self):
+        """Правка и удаление поста сразу видны в поиске."""
+        post = Post.objects.create(author=self.user, text='Бегемот')
+        self.assertEqual(self.search('бегемот'), [post])
+        post.text = 'Носорог'
+        post.save()
+        self.assertEqual(self.search('бегемот'), [])
+        self.assertEqual(self.search('носорог'), [post])
+        post.delete()
+        self.assertEqual(self.search('носорог'), [])
+
+    def test_keyset_pagination(self):
+        """Страницы поиска листаются курсором без повторов."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Слон номер {number}')
+            for number in range(PAGE_QUANTITY + 3))
+        response = self.client.get(reverse('posts:search'), {'q': 'слон'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), PAGE_QUANTITY)
+        self.assertTrue(page_obj.has_next())
+        response = self.client.get(reverse('posts:search'), {
+            'q': 'слон', 'after': page_obj.next_cursor})
+        second = response.context['page_obj']
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        self.assertFalse(set(page_obj) & set(second))
+
+    def test_header_marks_search_active(self):
+        """Ссылка на поиск в шапке подсвечена на странице поиска."""
+        response = self.client.get(reverse('posts:search'))
+        self.assertContains(response, 'class="nav-link active"', count=1)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'class="nav-link active"')
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идет по индексу, а не по LIKE."""
+        admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(1) as queries:
+            results, duplicates = admin.get_search_results(
+                request, Post.objects.all(), 'туман')
+            self.assertEqual(set(results), {self.strong, self.weak})
+        self.assertIn('MATCH', queries.captured_queries[0]['sql'])
+        self.assertFalse(duplicates)
+
+    def test_rebuild_restores_triggers(self):
+        """rebuild_search_index восстанавливает пропавшие триггеры."""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_insert')
+        post = Post.objects.create(author=self.user, text='Жираф')
+        self.assertEqual(self.search('жираф'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('пересобраны', out.getvalue())
+        self.assertEqual(self.search('жираф'), [post])
+
+    def test_match_expression(self):
+        """Ввод пользователя экранируется, последнее слово — префикс."""
+        self.assertEqual(search.match_expression('Ёж OR "туман'),
+                         '"ёж" "or" "туман"*')
+        self.assertIsNone(search.match_expression(' - * '))
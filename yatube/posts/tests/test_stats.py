@@ -0,0 +1,74 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def counters(self, user):
+        stats = AuthorStats.objects.get(author=user)
+        return (stats.posts_count, stats.comments_count,
+                stats.followers_count, stats.following_count)
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(author=self.author, text='пост')
+        Post.objects.create(author=self.author, text='пост 2')
+        comment = Comment.objects.create(
+            author=self.reader, post=post, text='коммент')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.counters(self.author), (2, 0, 1, 0))
+        self.assertEqual(self.counters(self.reader), (0, 1, 0, 1))
+
+        comment.delete()
+        follow.delete()
+        post.delete()
+        self.assertEqual(self.counters(self.author), (1, 0, 0, 0))
+        self.assertEqual(self.counters(self.reader), (0, 0, 0, 0))
+
+    def test_counter_failure_rolls_back_write(self):
+        """Запись и счетчик в одной транзакции: без счетчика нет и
+        записи."""
+        with mock.patch('posts.stats.increment', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                Post.objects.create(author=self.author, text='пост')
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+
+    def test_reconcile_fixes_drift(self):
+        """Команда reconcile_author_stats исправляет расхождения."""
+        Post.objects.create(author=self.author, text='пост')
+        AuthorStats.objects.filter(author=self.author).update(
+            posts_count=42, followers_count=7)
+        AuthorStats.objects.filter(author=self.reader).delete()
+        out = StringIO()
+        call_command('reconcile_author_stats', stdout=out)
+        self.assertEqual(self.counters(self.author), (1, 0, 0, 0))
+        self.assertEqual(self.counters(self.reader), (0, 0, 0, 0))
+        self.assertIn('исправлено: 2', out.getvalue())
+
+    def test_profile_uses_stored_count(self):
+        """Профиль берет число постов из счетчика, а не из COUNT(*)."""
+        Post.objects.create(author=self.author, text='пост')
+        AuthorStats.objects.filter(author=self.author).update(posts_count=5)
+        response = self.client.get(f'/profile/{self.author.username}/')
+        self.assertEqual(response.context['post_count'], 5)
+
+    def test_deleting_author_with_posts(self):
+        """Удаление автора не ломается на каскаде счетчиков."""
+        author = User.objects.create_user(username='leaving')
+        post = Post.objects.create(author=author, text='пост')
+        Comment.objects.create(author=self.reader, post=post, text='к')
+        Follow.objects.create(user=self.reader, author=author)
+        author.delete()
+        self.assertEqual(self.counters(self.reader), (0, 0, 0, 0))
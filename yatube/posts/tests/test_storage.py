@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from posts.models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF[:-3] + b'\x0B\x00\x3B'
+
+
+def run_on_commit(function):
+    function()
+
+
+def age(path):
+    """Состаривает файл за пределы MEDIA_RELEASE_GRACE."""
+    old = os.stat(path).st_mtime - settings.MEDIA_RELEASE_GRACE - 1
+    os.utime(path, (old, old))
+
+
+@mock.patch('posts.thumbnails.transaction.on_commit', run_on_commit)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        # У каждого теста свой MEDIA_ROOT: файлы не откатываются
+        # вместе с транзакцией.
+        self.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_settings.enable()
+
+    def tearDown(self):
+        super().tearDown()
+        self.media_settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        cache.clear()
+
+    def create_post(self, name='small.gif', content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые загрузки ссылаются на один файл."""
+        first = self.create_post('small.gif')
+        second = self.create_post('copy.gif')
+        other = self.create_post('small.gif', OTHER_GIF)
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertRegex(first.image.name,
+                         r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$')
+        shard = os.path.dirname(first.image.path)
+        self.assertEqual(len(os.listdir(shard)), 1)
+
+    def test_file_removed_with_last_reference(self):
+        """Файл удаляется вместе с последним ссылающимся постом."""
+        first = self.create_post()
+        second = self.create_post()
+        path = first.image.path
+        age(path)
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_fresh_upload_keeps_shared_file(self):
+        """Файл, который только что загрузили снова, не удаляется:
+        пост с ним мог еще не закоммититься."""
+        post = self.create_post()
+        path = post.image.path
+        age(path)
+        storage = Post._meta.get_field('image').storage
+        # Вторая загрузка: файл сохранен, а поста еще нет в базе.
+        storage.save('posts/copy.gif', ContentFile(SMALL_GIF))
+        post.delete()
+        self.assertTrue(os.path.exists(path))
+
+    def test_replaced_image_is_released(self):
+        """Замена картинки при редактировании освобождает старый файл."""
+        post = self.create_post()
+        path = post.image.path
+        age(path)
+        post.image = SimpleUploadedFile('new.gif', OTHER_GIF, 'image/gif')
+        post.save()
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(post.image.path))
+
+    def test_dedupe_command_merges_legacy_copies(self):
+        """Команда dedupe_post_images сливает старые копии картинок."""
+        storage = Post._meta.get_field('image').storage
+        legacy = []
+        for name in ('posts/Chrysanthemum.gif',
+                     'posts/Chrysanthemum_F2Aw.gif'):
+            path = storage.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as legacy_file:
+                legacy_file.write(SMALL_GIF)
+            legacy.append(name)
+        for name in legacy:
+            post = Post.objects.create(author=self.user, text='Старый пост')
+            Post.objects.filter(pk=post.pk).update(image=name)
+        Post.objects.create(author=self.user, text='Пропавший файл')
+        Post.objects.filter(text='Пропавший файл').update(
+            image='posts/lost.gif')
+
+        out = StringIO()
+        call_command('dedupe_post_images', stdout=out)
+        self.assertIn('Перенесено: 1, слито с дубликатами: 1, '
+                      'файлов не найдено: 1', out.getvalue())
+        names = set(Post.objects.filter(text='Старый пост').values_list(
+            'image', flat=True))
+        self.assertEqual(len(names), 1)
+        new_name = names.pop()
+        self.assertEqual(storage.open(new_name).read(), SMALL_GIF)
+        for name in legacy:
+            self.assertFalse(storage.exists(name))
+
+    def test_hashed_name_is_stable(self):
+        """Имя файла зависит только от содержимого и расширения."""
+        storage = Post._meta.get_field('image').storage
+        self.assertEqual(
+            storage.hashed_name('posts/a.GIF', ContentFile(SMALL_GIF)),
+            storage.hashed_name('posts/b.gif', ContentFile(SMALL_GIF)),
+        )
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from posts.models import Post
+from posts.thumbnails import get_alias_thumbnail
+from sorl.thumbnail import default
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+ORPHANS = ('cache/aa/bb/orphan.jpg', 'posts/ab/orphan.gif',
+           'posts/legacy.gif')
+
+
+@mock.patch('time.sleep')
+@mock.patch('posts.thumbnails.transaction.on_commit', lambda function: None)
+class SweepMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.media_root = os.path.join(self.root, 'media')
+        self.media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_settings.enable()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.thumbnail = get_alias_thumbnail(self.post.image, 'card')
+        for name in ORPHANS:
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as orphan:
+                orphan.write(SMALL_GIF)
+
+    def tearDown(self):
+        super().tearDown()
+        self.media_settings.disable()
+        shutil.rmtree(self.root, ignore_errors=True)
+        cache.clear()
+
+    def sweep(self, *args):
+        out = StringIO()
+        call_command(
+            'sweep_media', '--min-age=0',
+            f'--state-file={os.path.join(self.root, "state.json")}',
+            f'--quarantine={os.path.join(self.root, "quarantine")}',
+            *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def media_exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_orphans_moved_to_quarantine(self, sleep):
+        """Сироты уходят в карантин, живые файлы остаются на месте."""
+        output = self.sweep()
+        self.assertIn('Проверено файлов: 5, сирот (в карантине): 3', output)
+        for name in ORPHANS:
+            self.assertFalse(self.media_exists(name))
+            self.assertTrue(os.path.exists(
+                os.path.join(self.root, 'quarantine', name)))
+        self.assertTrue(self.media_exists(self.post.image.name))
+        self.assertTrue(self.media_exists(self.thumbnail.name))
+
+    def test_delete_and_dry_run(self, sleep):
+        """--dry-run ничего не трогает, --delete удаляет сирот."""
+        self.assertIn('сирот (найдено): 3', self.sweep('--dry-run'))
+        self.assertTrue(all(self.media_exists(name) for name in ORPHANS))
+        self.sweep('--delete')
+        self.assertFalse(any(self.media_exists(name) for name in ORPHANS))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, 'quarantine')))
+
+    def test_thumbnails_of_swept_original(self, sleep):
+        """Картинка поста, удаленного в окно MEDIA_RELEASE_GRACE,
+        уходит вместе с миниатюрами и их записями в sorl."""
+        image = self.post.image.name
+        self.post.delete()
+        output = self.sweep('--delete')
+        self.assertIn('Проверено файлов: 5, сирот (удалено): 5', output)
+        self.assertFalse(self.media_exists(image))
+        self.assertFalse(self.media_exists(self.thumbnail.name))
+        self.assertIsNone(default.kvstore.get(self.thumbnail))
+        self.assertIn('Проверено файлов: 0', self.sweep('--delete'))
+
+    def test_fresh_files_are_skipped(self, sleep):
+        """Файлы моложе --min-age не считаются сиротами."""
+        out = StringIO()
+        call_command('sweep_media', '--dry-run', '--min-age=3600',
+                     stdout=out)
+        self.assertIn('сирот (найдено): 0', out.getvalue())
+
+    def test_resumes_from_saved_cursor(self, sleep):
+        """С --limit обход продолжается с места прошлой остановки."""
+        self.assertIn('Проверено файлов: 2', self.sweep('--limit=2'))
+        self.assertFalse(self.media_exists(ORPHANS[0]))
+        self.assertTrue(self.media_exists(ORPHANS[1]))
+        self.assertIn('Проверено файлов: 3', self.sweep())
+        self.assertFalse(self.media_exists(ORPHANS[1]))
+        # Обход завершен, следующий запуск начинает сначала.
+        self.assertIn('Проверено файлов: 2', self.sweep())
+
+    def test_rate_limit_pauses_between_batches(self, sleep):
+        """Между пачками команда выдерживает паузу по --rate."""
+        self.sweep('--batch-size=2', '--rate=1')
+        self.assertEqual(sleep.call_count, 3)
+        self.assertGreater(sleep.call_args_list[0][0][0], 1)
@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class TemplateBenchmarkTest(TestCase):
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def test_every_posts_template(self):
+        """Каждый шаблон posts отрисован с диска и из кэша."""
+        user = User.objects.create_user(username='auth')
+        group = Group.objects.create(title='Группа', slug='group')
+        for number in range(12):
+            post = Post.objects.create(
+                author=user, group=group, text=f'Пост номер {number}')
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        out = StringIO()
+        call_command('template_benchmark', repeat=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        for name in ('posts/index.html', 'posts/post_detail.html',
+                     'posts/includes/paginator.html',
+                     'posts/includes/post_card.html'):
+            with self.subTest(name=name):
+                self.assertTrue(
+                    any(line.startswith(f'{name}: ') for line in lines))
+        self.assertTrue(lines[-1].startswith('Всего: '))
+
+    def test_empty_database(self):
+        with self.assertRaises(CommandError):
+            call_command('template_benchmark', stdout=StringIO())
@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from posts import thumbnails
+from posts.models import Post
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class InlineExecutor:
+    """Пул без процессов: тестовая база не видна дочерним процессам."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, iterable, chunksize=1):
+        return map(fn, iterable)
+
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def create_post(self, content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', content, 'image/gif'),
+        )
+
+    def assert_thumbnails_ready(self, image):
+        keys = default.kvstore._get(ImageFile(image).key,
+                                    identity='thumbnails')
+        self.assertEqual(len(keys), len(settings.THUMBNAIL_ALIASES))
+        for key in keys:
+            self.assertTrue(default.kvstore._get(key).exists())
+
+    def test_save_schedules_generation(self):
+        """Сохранение поста с картинкой ставит миниатюры в очередь."""
+        with mock.patch('posts.thumbnails.transaction') as transaction:
+            post = self.create_post()
+            Post.objects.create(author=self.user, text='Без картинки')
+        commit = transaction.on_commit
+        commit.assert_called_once()
+        with mock.patch('posts.thumbnails._submit') as submit:
+            commit.call_args[0][0]()
+        submit.assert_called_once_with(post.image.name)
+
+    def test_generate_builds_every_alias(self):
+        """generate строит миниатюры всех геометрий из настроек."""
+        post = self.create_post()
+        self.assertEqual(thumbnails.generate(post.image.name), 0)
+        self.assert_thumbnails_ready(post.image)
+
+    def test_backfill_command(self):
+        """Команда pregenerate_thumbnails достраивает миниатюры."""
+        post = self.create_post()
+        with mock.patch('posts.thumbnails.create_executor',
+                        lambda workers: InlineExecutor()):
+            out = StringIO()
+            call_command('pregenerate_thumbnails', stdout=out)
+        self.assertIn('Обработано картинок: 1, с ошибками: 0',
+                      out.getvalue())
+        self.assert_thumbnails_ready(post.image)
+
+    def test_prefetch_resolves_page_without_queries(self):
+        """Миниатюры страницы разрешаются одним обращением к кэшу."""
+        # Разное содержимое: одинаковые картинки делят один файл.
+        posts = [self.create_post(SMALL_GIF[:-3] + bytes([i, 0, 0x3B]))
+                 for i in range(3)]
+        posts.append(Post.objects.create(author=self.user, text='Без фото'))
+        for post in posts[:2]:
+            thumbnails.generate(post.image.name)
+        posts = list(Post.objects.order_by('pk'))
+        # Ключи считаются внутренними методами sorl: сверяем их
+        # с публичным get_thumbnail.
+        geometry, options = settings.THUMBNAIL_ALIASES['card']
+        expected = [get_thumbnail(post.image, geometry, **options).url
+                    for post in posts[:2]]
+        with self.assertNumQueries(0):
+            thumbnails.prefetch_thumbnails(posts)
+        self.assertEqual(
+            [post.image.thumbnails['card'].url for post in posts[:2]],
+            expected)
+        self.assertFalse(hasattr(posts[2].image, 'thumbnails'))
+        self.assertIsNone(thumbnails.get_alias_thumbnail(
+            posts[3].image, 'card'))
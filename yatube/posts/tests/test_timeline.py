@@ -0,0 +1,97 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from posts.models import Follow, Post, Timeline
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+
+    def timeline_ids(self):
+        return list(Timeline.objects.filter(
+            user=self.reader).values_list('post_id', flat=True))
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        """Подписка наполняет ленту, новые посты попадают в нее сразу."""
+        old = Post.objects.create(author=self.author, text='старый')
+        Post.objects.create(author=self.other, text='чужой')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline_ids(), [old.pk])
+        new = Post.objects.create(author=self.author, text='новый')
+        self.assertEqual(self.timeline_ids(), [new.pk, old.pk])
+
+    def test_unfollow_and_delete_prune_timeline(self):
+        """Отписка и удаление поста убирают записи из ленты."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='пост')
+        Post.objects.create(author=self.author, text='еще пост')
+        post.delete()
+        self.assertEqual(len(self.timeline_ids()), 1)
+        follow.delete()
+        self.assertEqual(self.timeline_ids(), [])
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_timeline_is_capped(self):
+        """Длина ленты не превышает TIMELINE_LENGTH."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(author=self.author, text=str(i))
+                 for i in range(5)]
+        self.assertEqual(self.timeline_ids(),
+                         [post.pk for post in posts[:1:-1]])
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_fan_out_queries_do_not_grow_with_followers(self):
+        """Лишние записи всех подписчиков обрезаются одним запросом."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with CaptureQueriesContext(connection) as single:
+            Post.objects.create(author=self.author, text='один')
+        for number in range(4):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'reader{number}'),
+                author=self.author)
+        with self.assertNumQueries(len(single.captured_queries)):
+            Post.objects.create(author=self.author, text='пятерым')
+        for number in range(3):
+            Post.objects.create(author=self.author, text=str(number))
+        self.assertEqual(Timeline.objects.count(), 5 * 3)
+
+    def test_migration_backfills_existing_follows(self):
+        """Миграция наполняет ленты тех, кто подписался до нее."""
+        post = Post.objects.create(author=self.author, text='пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Timeline.objects.all().delete()
+        migration = import_module('posts.migrations.0010_timeline')
+        migration.backfill_timelines(apps, None)
+        self.assertEqual(self.timeline_ids(), [post.pk])
+
+    def test_rebuild_command(self):
+        """Команда rebuild_timelines восстанавливает потерянные ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='пост')
+        Timeline.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.timeline_ids(), [post.pk])
+
+    def test_rebuild_long_timeline(self):
+        """Пересборка вставляет ленту длиннее лимита одной вставки
+        SQLite."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.bulk_create(
+            Post(author=self.author, text=str(number))
+            for number in range(600))
+        Timeline.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(len(self.timeline_ids()), 600)
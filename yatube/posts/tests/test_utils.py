@@ -0,0 +1,139 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from posts.models import Post
+from posts.utils import (CachedCountPaginator, decode_cursor, encode_cursor,
+                         iter_keyset, page_quan)
+
+User = get_user_model()
+
+
+@override_settings(PAGE_QUANTITY=4)
+class CursorPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+            for i in range(10)
+        ]
+        cls.factory = RequestFactory()
+
+    def get_page(self, **params):
+        request = self.factory.get('/', params)
+        return page_quan(Post.objects.all(), request, mode='cursor')
+
+    def test_cursor_round_trip(self):
+        """Токен курсора раскодируется в исходную пару."""
+        post = CursorPaginationTest.posts[0]
+        token = encode_cursor(post.pub_date, post.pk)
+        self.assertEqual(decode_cursor(token), (post.pub_date, post.pk))
+        self.assertIsNone(decode_cursor('мусор'))
+        self.assertIsNone(decode_cursor(''))
+
+    def test_walk_forward_and_back(self):
+        """Курсоры обходят ленту целиком в обе стороны."""
+        expected = [post.pk for post in Post.objects.order_by(
+            '-pub_date', '-pk')]
+        page = self.get_page()['page_object']
+        self.assertFalse(page.has_previous())
+        seen, pages = [], []
+        while True:
+            pages.append(page)
+            seen += [post.pk for post in page]
+            if not page.has_next():
+                break
+            page = self.get_page(after=page.next_cursor)['page_object']
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+
+        back = self.get_page(before=pages[-1].previous_cursor)
+        self.assertEqual(
+            [post.pk for post in back['page_object']],
+            [post.pk for post in pages[-2]])
+        self.assertTrue(back['page_object'].has_previous())
+        first = self.get_page(before=pages[1].previous_cursor)
+        self.assertFalse(first['page_object'].has_previous())
+
+    def test_bad_token_returns_first_page(self):
+        """Испорченный токен отдает первую страницу."""
+        page = self.get_page(after='%%%')['page_object']
+        self.assertEqual(page[0].pk, CursorPaginationTest.posts[-1].pk)
+
+    def test_numbered_mode_by_default(self):
+        """По умолчанию остается нумерованная пагинация."""
+        request = self.factory.get('/', {'page': 2})
+        page = page_quan(Post.objects.all(), request)['page_object']
+        self.assertEqual(page.number, 2)
+        self.assertEqual(page.paginator.num_pages, 3)
+
+    def test_iter_keyset(self):
+        """Обход пачками отдает все строки по порядку, и объекты,
+        и values(); полная последняя пачка не теряет хвост."""
+        expected = [post.pk for post in CursorPaginationTest.posts]
+        with self.assertNumQueries(4):
+            rows = list(iter_keyset(Post.objects.all(), 3))
+        self.assertEqual([post.pk for post in rows], expected)
+        rows = iter_keyset(Post.objects.values('pk'), 5)
+        self.assertEqual([row['pk'] for row in rows], expected)
+
+    @override_settings(PAGINATION_MODE='cursor')
+    def test_index_renders_cursor_links(self):
+        """Главная страница в режиме курсоров отдает ссылки ?after=,
+        а по ним — ссылку ?before= обратно."""
+        response = self.client.get('/')
+        self.assertNotContains(response, '?page=')
+        after = re.search(r'\?after=([\w-]+)', response.content.decode())
+        self.assertIsNotNone(after)
+        response = self.client.get('/', {'after': after.group(1)})
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in CursorPaginationTest.posts[5:1:-1]])
+        self.assertContains(response, '?before=')
+
+
+class CachedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        for i in range(3):
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def test_count_is_cached_until_posts_change(self):
+        """COUNT(*) выполняется один раз до следующей записи поста."""
+        self.assertEqual(CachedCountPaginator(Post.objects.all(), 2).count, 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(Post.objects.all(), 2).count, 3)
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertEqual(CachedCountPaginator(Post.objects.all(), 2).count, 4)
+
+    def test_page_window(self):
+        """Окно страниц: первая, последняя и соседи текущей."""
+        paginator = CachedCountPaginator(range(1000), 10)
+        self.assertEqual(paginator.page_window(1), [1, 2, 3, None, 100])
+        self.assertEqual(paginator.page_window(50),
+                         [1, None, 48, 49, 50, 51, 52, None, 100])
+        self.assertEqual(paginator.page_window(97),
+                         [1, None, 95, 96, 97, 98, 99, 100])
+        self.assertEqual(CachedCountPaginator(range(30), 10).page_window(2),
+                         [1, 2, 3])
+
+    @override_settings(PAGE_QUANTITY=1)
+    def test_paginator_renders_window_only(self):
+        """Шаблон пагинатора выводит только окно страниц."""
+        for i in range(20):
+            Post.objects.create(author=self.user, text=f'Еще пост {i}')
+        response = self.client.get('/?page=10')
+        self.assertContains(response, '?page=23"')
+        self.assertContains(response, '?page=12"')
+        self.assertNotContains(response, '?page=13"')
+        self.assertContains(response, '&hellip;', count=2)
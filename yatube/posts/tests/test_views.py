@@ -8,7 +8,8 @@ from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase
 from django.urls import reverse
-from posts.models import Group, Post
+from posts.feed_cache import get_generation
+from posts.models import Follow, Group, Post
 from yatube.settings import PAGE_QUANTITY
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -350,6 +351,151 @@ class FollowUnfollowViewsTest(TestCase):
         response = self.authorized_client.get(reverse('posts:follow_index'))
         self.assertEqual(2, response.context['page_obj'].paginator.count)
 
+        cache.clear()
         response = self.authorized_follower.get(reverse('posts:follow_index'))
         last_post = response.context.get('page_obj')[0]
         self.assertEqual(post2.id, last_post.id)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Исходный текст',
+            group=cls.group
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def test_card_is_shared_between_feeds(self):
+        """Карточка поста рендерится один раз и переиспользуется."""
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        response = self.client.get(reverse(
+            'posts:group_posts', kwargs={'slug': self.group.slug}))
+        self.assertContains(response, 'Исходный текст')
+        self.assertNotContains(response, 'Тихая правка')
+
+    def test_edit_bumps_card_version(self):
+        """Редактирование поста сбрасывает кэш его карточки."""
+        url = reverse('posts:profile', kwargs={'username': 'auth'})
+        self.client.get(url)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый текст', 'group': self.group.pk},
+        )
+        response = self.client.get(url)
+        self.assertContains(response, 'Новый текст')
+
+    def test_author_and_group_changes_bypass_card_cache(self):
+        """Переименование автора и удаление группы не отдают старую
+        карточку: post.updated при этом не меняется."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        User.objects.filter(pk=self.user.pk).update(
+            first_name='Новое', last_name='Имя')
+        Group.objects.filter(pk=self.group.pk).delete()
+        response = self.client.get(url)
+        self.assertContains(response, 'Новое Имя')
+        self.assertNotContains(response, self.group.slug)
+
+
+class FeedCacheInvalidationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        super().tearDown()
+        cache.clear()
+
+    def test_pages_are_cached(self):
+        """Без записей в базу ленты отдаются из кэша."""
+        Post.objects.create(author=self.author, text='Первый пост')
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.update(text='Правка в обход сигналов')
+        response = self.client.get(url)
+        self.assertContains(response, 'Первый пост')
+
+    def test_browsers_revalidate(self):
+        """Браузер не держит ленту у себя, а переспрашивает сервер."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            for _ in range(2):
+                with self.subTest(url=url):
+                    response = self.authorized_client.get(url)
+                    self.assertEqual(response['Cache-Control'],
+                                     'private, max-age=0')
+                    self.assertFalse(response.has_header('Expires'))
+
+    def test_login_keeps_generation(self):
+        """Вход на сайт не сбрасывает закэшированные ленты."""
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('secret')
+        user.save()
+        generation = get_generation()
+        self.assertTrue(self.client.login(
+            username='reader', password='secret'))
+        self.assertEqual(get_generation(), generation)
+        user.save(update_fields=['first_name'])
+        self.assertNotEqual(get_generation(), generation)
+
+    def test_new_post_appears_immediately(self):
+        """Новый пост сразу виден во всех закэшированных лентах."""
+        Follow.objects.create(user=self.user, author=self.author)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        Post.objects.create(
+            author=self.author, group=self.group, text='Свежий пост')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Свежий пост')
+
+    def test_cache_is_per_reader(self):
+        """Закэшированная лента подписок не утекает другому читателю."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(author=self.author, text='Для подписчиков')
+        url = reverse('posts:follow_index')
+        self.authorized_client.get(url)
+        other = Client()
+        other.force_login(self.author)
+        response = other.get(url)
+        self.assertNotContains(response, 'Для подписчиков')
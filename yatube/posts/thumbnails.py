@@ -0,0 +1,204 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+
+
+def get_alias_thumbnail(image, alias):
+    """Миниатюра картинки для геометрии из THUMBNAIL_ALIASES.
+
+    Как и тег {% thumbnail %}, ошибки не пробрасывает: пишет их в лог
+    и возвращает None.
+    """
+    if not image:
+        return None
+    prefetched = getattr(image, 'thumbnails', {})
+    if alias in prefetched:
+        return prefetched[alias]
+    geometry, options = settings.THUMBNAIL_ALIASES[alias]
+    try:
+        with metrics.timer('thumb'):
+            return get_thumbnail(image, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось получить миниатюру %s', image)
+        return None
+
+
+def _thumbnail_file(image, geometry, options):
+    """Файл миниатюры, который построил бы get_thumbnail, без обращения
+    к хранилищу ключей: имя повторяет расчет из ThumbnailBackend.
+
+    _get_format и _get_thumbnail_filename — внутренние методы sorl,
+    поэтому версия sorl-thumbnail закреплена в requirements (12.7.0).
+    Публичный get_thumbnail для каждой картинки ходил бы в хранилище
+    ключей отдельно, а тут нужны одни ключи для общего get_many.
+    """
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def prefetch_thumbnails(posts, alias='card'):
+    """Разрешает миниатюры целой страницы постов одним get_many к кэшу
+    хранилища ключей sorl.
+
+    Найденные миниатюры сохраняются в post.image.thumbnails и дальше
+    отдаются тегом post_thumbnail без запросов. Промахи остаются на
+    обычный путь через get_thumbnail.
+    """
+    prefetch_images([post.image for post in posts if post.image], alias)
+
+
+def prefetch_images(images, alias='card'):
+    """То же, что prefetch_thumbnails, для самих файлов картинок."""
+    kv_cache = getattr(default.kvstore, 'cache', None)
+    if kv_cache is None or not images:
+        return
+    geometry, options = settings.THUMBNAIL_ALIASES[alias]
+    wanted = [
+        (image, add_prefix(_thumbnail_file(image, geometry, options).key))
+        for image in images
+    ]
+    found = kv_cache.get_many([key for _, key in wanted])
+    for image, key in wanted:
+        value = found.get(key)
+        if isinstance(value, str):
+            image.thumbnails = {**getattr(image, 'thumbnails', {}),
+                                alias: deserialize_image_file(value)}
+
+
+def generate(name):
+    """Строит все миниатюры картинки поста; выполняется в процессе пула.
+
+    Возвращает число геометрий, которые не удалось построить.
+    """
+    from .models import Post
+
+    field = Post._meta.get_field('image')
+    image = field.attr_class(None, field, name)
+    return sum(get_alias_thumbnail(image, alias) is None
+               for alias in settings.THUMBNAIL_ALIASES)
+
+
+def _init_worker(database_name):
+    import django
+    from django.conf import settings
+
+    # Дочерний процесс работает с той же базой, что и родитель,
+    # даже если родитель подменил ее имя (например, под тестами).
+    settings.DATABASES['default']['NAME'] = database_name
+    django.setup()
+
+
+def _database_is_shared():
+    """Видна ли база родителя дочерним процессам пула."""
+    return not (connection.vendor == 'sqlite'
+                and connection.creation.is_in_memory_db(
+                    connection.settings_dict['NAME']))
+
+
+def get_executor(max_workers=None):
+    """Пул процессов для миниатюр, общий для всего процесса Django."""
+    global _executor, _pending
+    with _executor_lock:
+        if _executor is None:
+            _executor = create_executor(max_workers)
+            _pending = threading.BoundedSemaphore(
+                settings.THUMBNAIL_QUEUE_SIZE)
+    return _executor
+
+
+def create_executor(max_workers=None):
+    # spawn, а не fork: дочерний процесс не должен наследовать
+    # открытые соединения с базой родителя.
+    return ProcessPoolExecutor(
+        max_workers=max_workers or settings.THUMBNAIL_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(connection.settings_dict['NAME'],),
+    )
+
+
+def _submit(name):
+    if not _database_is_shared():
+        return
+    executor = get_executor()
+    if not _pending.acquire(blocking=False):
+        # Очередь заполнена: миниатюру построит первый рендер шаблона.
+        logger.warning('Очередь миниатюр заполнена, пропускаем %s', name)
+        return
+    try:
+        future = executor.submit(generate, name)
+    except RuntimeError:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda future: _pending.release())
+
+
+def schedule(image):
+    """Ставит построение миниатюр в пул после коммита транзакции."""
+    if image and settings.THUMBNAIL_PREGENERATE:
+        transaction.on_commit(lambda: _submit(image.name))
+
+
+def release(name):
+    """Удаляет картинку и ее миниатюры, если на нее больше не ссылается
+    ни один пост: одинаковые загрузки делят один файл.
+
+    Свежий файл не трогаем: такую же картинку могли только что
+    загрузить для поста, который еще не закоммичен, и хранилище
+    обновило mtime общего файла. Если он все же осиротел, его уберет
+    sweep_media.
+    """
+    from .models import Post
+
+    if not name or Post.objects.filter(image=name).exists():
+        return
+    field = Post._meta.get_field('image')
+    try:
+        modified = field.storage.get_modified_time(name)
+    except (OSError, SuspiciousFileOperation):
+        return
+    grace = timedelta(seconds=settings.MEDIA_RELEASE_GRACE)
+    if modified > timezone.now() - grace:
+        return
+    try:
+        delete(field.attr_class(None, field, name))
+    except (OSError, SuspiciousFileOperation):
+        logger.warning('Не удалось удалить картинку %s', name, exc_info=True)
+
+
+def schedule_release(name):
+    """Освобождает картинку после коммита, чтобы откат транзакции
+    не оставил пост без файла."""
+    if name:
+        transaction.on_commit(lambda: release(name))
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Follow, Post, Timeline
+
+
+def trim(user_ids):
+    """Оставляет в лентах читателей не больше TIMELINE_LENGTH записей.
+
+    user_ids — список id или подзапрос с ними. Лишние записи всех
+    читателей удаляются одним запросом: нумерация ROW_NUMBER() идет
+    внутри ленты каждого читателя от новых записей к старым.
+    """
+    ranked = Timeline.objects.filter(user_id__in=user_ids).annotate(
+        place=Window(
+            RowNumber(), partition_by=[F('user_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        ),
+    ).order_by().values('id', 'place')
+    sql, params = ranked.query.sql_with_params()
+    table = connection.ops.quote_name(Timeline._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM ({sql}) ranked WHERE place > %s)',
+            [*params, settings.TIMELINE_LENGTH])
+
+
+@transaction.atomic
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    Timeline.objects.bulk_create(
+        [Timeline(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers],
+        ignore_conflicts=True,
+    )
+    # Подзапросом, а не списком: у популярного автора подписчиков
+    # больше, чем SQLite примет параметров в одном запросе.
+    trim(followers)
+
+
+@transaction.atomic
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('id', 'pub_date')
+    Timeline.objects.bulk_create(
+        [Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts[:settings.TIMELINE_LENGTH]],
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    Timeline.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def rebuild(user_ids, batch_size=1000):
+    """Пересобирает ленты читателей целиком по таблице подписок."""
+    for user_id in user_ids:
+        with transaction.atomic():
+            Timeline.objects.filter(user_id=user_id).delete()
+            posts = Post.objects.filter(
+                author__following__user_id=user_id
+            ).order_by('-pub_date').values_list('id', 'pub_date')
+            entries = [
+                Timeline(user_id=user_id, post_id=post_id,
+                         pub_date=pub_date)
+                for post_id, pub_date in posts[:settings.TIMELINE_LENGTH]
+            ]
+            # Django 2.2 не сверяет явный batch_size с лимитами базы,
+            # а SQLite не примет больше 500 строк в одной вставке.
+            Timeline.objects.bulk_create(entries, batch_size=min(
+                batch_size, connection.ops.bulk_batch_size(
+                    Timeline._meta.concrete_fields, entries)))
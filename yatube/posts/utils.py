@@ -1,11 +1,258 @@
+import base64
+import binascii
+import hashlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Paginator
-from yatube.settings import PAGE_QUANTITY
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections
+from django.db.models import Max, Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .feed_cache import get_generation
+from .thumbnails import prefetch_thumbnails
+
+# JSON для ответов и выгрузок: кириллица как есть, даты в ISO 8601
+dumps = DjangoJSONEncoder(ensure_ascii=False).encode
+
+
+def batched(iterable, size):
+    """Списки по size элементов из iterable; последний может быть
+    короче."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def encode_cursor(value, pk):
+    """Упаковывает пару (дата или число, id) в непрозрачный токен
+    для URL."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = f'{value!s}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, parse=parse_datetime):
+    """Распаковывает токен курсора; на мусор возвращает None.
+
+    parse превращает первую часть токена обратно в значение поля:
+    по умолчанию это дата, для рейтинга поиска — float.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = raw.decode().split('|')
+        value = parse(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+class CursorPage:
+    """Страница ленты без COUNT(*) и OFFSET."""
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous, field):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.field = field
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _cursor(self, obj):
+        return encode_cursor(getattr(obj, self.field), obj.pk)
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self._cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self._cursor(self.object_list[0])
+        return None
+
+
+def beyond(field, cursor, lookup='lt'):
+    """Условие «строка за курсором» для сортировки по (field, id):
+    lookup='lt' — дальше к старым записям, 'gt' — к новым."""
+    value, pk = cursor
+    return (Q(**{f'{field}__{lookup}': value})
+            | Q(**{field: value, f'pk__{lookup}': pk}))
+
+
+def iter_keyset(queryset, chunk_size, key='pk'):
+    """Все строки queryset по возрастанию уникального key пачками по
+    chunk_size: каждый запрос короткий, без OFFSET и без курсора,
+    открытого на весь обход.
+
+    Для values() поле key должно быть среди выбранных.
+    """
+    queryset = queryset.order_by(key)
+    page = queryset
+    while True:
+        batch = list(page[:chunk_size])
+        yield from batch
+        if len(batch) < chunk_size:
+            return
+        last = batch[-1]
+        last = last[key] if isinstance(last, dict) else getattr(last, key)
+        page = queryset.filter(**{f'{key}__gt': last})
+
+
+def cursor_page(queryset, request, per_page, field='pub_date'):
+    """Keyset-пагинация по (field, id) от новых записей к старым.
+
+    Принимает из запроса токены ?after= (следующая страница)
+    или ?before= (предыдущая страница).
+    """
+    after = decode_cursor(request.GET.get('after'))
+    before = decode_cursor(request.GET.get('before'))
+    if before is not None:
+        rows = list(queryset.filter(beyond(field, before, 'gt')).order_by(
+            field, 'pk')[:per_page + 1])
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return CursorPage(rows, True, has_previous, field)
+
+    if after is not None:
+        queryset = queryset.filter(beyond(field, after))
+    rows = list(queryset.order_by(f'-{field}', '-pk')[:per_page + 1])
+    has_next = len(rows) > per_page
+    return CursorPage(rows[:per_page], has_next, after is not None, field)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) на каждый запрос.
+
+    Число объектов кэшируется по тексту SQL-запроса и поколению лент,
+    поэтому любая запись поста сбрасывает кэш.
+    """
+    on_each_side = 2
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        signature = hashlib.md5(
+            str(self.object_list.query).encode()).hexdigest()
+        key = f'paginator:count:{get_generation()}:{signature}'
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, settings.FEED_CACHE_TIMEOUT)
+        return count
+
+    def page_window(self, number):
+        """Номера страниц для навигации: первая, последняя и по
+        on_each_side вокруг текущей; на месте пропусков стоит None."""
+        last = self.num_pages
+        pages = sorted({1, last, *range(
+            max(1, number - self.on_each_side),
+            min(last, number + self.on_each_side) + 1,
+        )})
+        window, previous = [], 0
+        for page in pages:
+            if page - previous > 1:
+                window.append(None)
+            window.append(page)
+            previous = page
+        return window
+
+
+def estimate_count(queryset):
+    """Оценка числа строк таблицы без COUNT(*): статистика планировщика,
+    а если ее еще не собирали, то наибольший id."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table])
+                row = cursor.fetchone()
+            except DatabaseError:
+                # Таблицы sqlite_stat1 нет, пока не было ANALYZE.
+                row = None
+            if row:
+                return int(row[0].split()[0])
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            if row and row[0] > 0:
+                return row[0]
+    return queryset.model._default_manager.using(queryset.db).aggregate(
+        last=Max('pk'))['last'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для списков админки на больших таблицах.
+
+    Если фильтров нет и в таблице больше ADMIN_COUNT_LIMIT строк, число
+    объектов берется из estimate_count; отфильтрованный список
+    считается не дальше ADMIN_COUNT_LIMIT строк.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
 
 
-def page_quan(queryset, request):
-    paginator = Paginator(queryset, PAGE_QUANTITY)
+def page_quan(queryset, request, mode=None, thumbnail='card'):
+    mode = mode or settings.PAGINATION_MODE
+    if mode == 'cursor':
+        page_object = cursor_page(queryset, request, settings.PAGE_QUANTITY)
+        prefetch_thumbnails(page_object, thumbnail)
+        return {
+            'paginator': None,
+            'page_number': None,
+            'page_object': page_object,
+        }
+    paginator = CachedCountPaginator(queryset, settings.PAGE_QUANTITY)
     page_number = request.GET.get('page')
     page_object = paginator.get_page(page_number)
+    prefetch_thumbnails(page_object, thumbnail)
     return {
         'paginator': paginator,
         'page_number': page_number,
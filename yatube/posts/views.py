@@ -1,13 +1,20 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
+from . import conditional, exports, follow_graph
+from .feed_cache import feed_cache_page
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import page_quan
+from .models import Comment, Follow, Group, Post, User
+from .search import find
+from .stats import get_stats
+from .thumbnails import prefetch_thumbnails
+from .utils import cursor_page, page_quan
 
 
-@cache_page(20)
+@feed_cache_page()
 def index(request):
     template = 'posts/index.html'
     posts = Post.objects.select_related('group', 'author').all()
@@ -20,10 +27,13 @@ def index(request):
     return render(request, template, context)
 
 
+@condition(etag_func=conditional.feed_etag,
+           last_modified_func=conditional.feed_last_modified)
+@feed_cache_page()
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.select_related('author', 'group')
     page_obj = page_quan(posts, request)
     context = {
         'group': group,
@@ -32,16 +42,16 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@condition(etag_func=conditional.feed_etag,
+           last_modified_func=conditional.feed_last_modified)
+@feed_cache_page()
 def profile(request, username):
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = page_quan(posts, request)
-    post_count = posts.count()
-    following = False
-
-    if request.user.is_authenticated:
-        following = author.following.filter(user=request.user).exists()
+    posts = author.posts.select_related('author', 'group')
+    page_obj = page_quan(posts, request, thumbnail='detail')
+    post_count = get_stats(author).posts_count
+    following = follow_graph.is_following(request.user.pk, author.pk)
     sub = (author != request.user)
     context = {
         'page_obj': page_obj['page_object'],
@@ -53,12 +63,19 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@condition(etag_func=conditional.post_etag,
+           last_modified_func=conditional.post_last_modified)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
-    post_count = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'author__stats', 'group'),
+        id=post_id,
+    )
+    post_count = get_stats(post.author).posts_count
     form = CommentForm(request.POST)
-    comments = post.comments.all()
+    comments = cursor_page(
+        post.comments.select_related('author'), request,
+        settings.COMMENT_PAGE_QUANTITY, field='created')
     context = {
         'post': post,
         'post_count': post_count,
@@ -68,6 +85,43 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@condition(etag_func=conditional.post_etag)
+def comments(request, post_id):
+    """Следующая порция комментариев поста для кнопки «Показать еще»."""
+    template = 'posts/includes/comment_list.html'
+    # Шаблону нужен только id поста для ссылки «Показать еще».
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    comments = cursor_page(
+        post.comments.select_related('author'),
+        request, settings.COMMENT_PAGE_QUANTITY, field='created')
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, template, context)
+
+
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '')
+    scope = 'comments' if request.GET.get('in') == 'comments' else 'posts'
+    if scope == 'comments':
+        page_obj = find(
+            Comment.objects.select_related('author', 'post'),
+            query, request, settings.PAGE_QUANTITY, field='created')
+    else:
+        page_obj = find(
+            Post.objects.select_related('author', 'group'),
+            query, request, settings.PAGE_QUANTITY)
+        prefetch_thumbnails(page_obj)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'scope': scope,
+    }
+    return render(request, template, context)
+
+
 @login_required
 def post_create(request):
     template = 'posts/create.html'
@@ -119,9 +173,12 @@ def add_comment(request, post_id):
 
 
 @login_required
+@feed_cache_page()
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = Post.objects.select_related('author', 'group').filter(
+        timeline_entries__user=request.user
+    ).order_by('-timeline_entries__pub_date')
     page_obj = page_quan(posts, request)
     follow = True
     context = {
@@ -146,3 +203,21 @@ def profile_unfollow(request, username):
         return redirect('posts:profile', username=username)
     get_object_or_404(Follow, user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+@login_required
+def export(request):
+    """Все посты и комментарии читателя одним файлом, с ?images=1 —
+    zip вместе с картинками."""
+    fmt = request.GET.get('format')
+    if fmt not in exports.FORMATS:
+        fmt = 'ndjson'
+    images = bool(request.GET.get('images'))
+    content_type, extension = exports.FORMATS[fmt]
+    if images:
+        content_type, extension = 'application/zip', 'zip'
+    response = StreamingHttpResponse(
+        exports.export(request.user, fmt, images), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{request.user.username}.{extension}"')
+    return response
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,11 +68,19 @@ MIDDLEWARE = [
 #     '127.0.0.1',
 # ]
 
+# один файл SQLite (WAL) на хост: все воркеры делят кэш страниц
+# и метаданные миниатюр; MAX_SIZE — предел размера в байтах
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
+# тесты работают на отдельном файле кэша, как и на отдельной базе
+TEST_RUNNER = 'core.test_runner.TestRunner'
 
 ROOT_URLCONF = 'yatube.urls'
 
@@ -81,7 +90,7 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -164,5 +173,64 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 # STATIC_ROOT  =  "/home/sssponomareva/yatube/static" 
 
 PAGE_QUANTITY = 10
+# комментариев на странице поста и в каждой догружаемой порции
+COMMENT_PAGE_QUANTITY = 20
+# 'numbered' — страницы с номерами (?page=), 'cursor' — курсоры
+# ?after=/?before= без COUNT(*) и OFFSET для больших лент
+PAGINATION_MODE = 'numbered'
+# наибольший ?limit= страницы JSON API
+API_PAGE_LIMIT = 100
+# сколько последних постов хранится в ленте подписок читателя
+TIMELINE_LENGTH = 1000
+# сколько секунд массив подписок читателя живет в кэше; записи Follow
+# стирают его сразу, TTL страхует от записей в обход сигналов
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+# страницы лент сбрасываются сигналами, поэтому TTL может быть большим
+FEED_CACHE_TIMEOUT = 60 * 15
+# карточка поста в кэше фрагментов; ее ключ меняется при любой правке
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+# время последнего комментария поста для Last-Modified; вытесненное
+# из кэша считается только что наступившим
+POST_MODIFIED_TIMEOUT = 60 * 60 * 24
+
+# списки админки точно считают строки только до этого предела
+ADMIN_COUNT_LIMIT = 10000
+# поиск ранжирует по bm25 столько самых новых совпадений
+SEARCH_RANK_WINDOW = 2000
+
+# геометрии миниатюр постов: псевдоним -> (геометрия, опции sorl)
+THUMBNAIL_ALIASES = {
+    'card': ('x339', {'crop': 'center', 'upscale': True}),
+    # и для карточек в профиле, как было до общего шаблона карточки
+    'detail': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# строить миниатюры сразу после загрузки картинки в пуле процессов
+THUMBNAIL_PREGENERATE = True
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_QUEUE_SIZE = 100
+
+# уборка осиротевших файлов media командой sweep_media:
+# курсор обхода, куда переносить сирот и сколько файлов в секунду проверять
+MEDIA_SWEEP_STATE_FILE = os.path.join(BASE_DIR, 'media_sweep.json')
+MEDIA_SWEEP_QUARANTINE = os.path.join(BASE_DIR, 'media_quarantine')
+MEDIA_SWEEP_RATE = 200
+# файлы моложе этого возраста (в секундах) не трогаются
+MEDIA_SWEEP_MIN_AGE = 60 * 60
+# картинку удаленного поста не удаляем сразу, если ее файл моложе
+# этого возраста (в секундах): на него может ссылаться незакоммиченный пост
+MEDIA_RELEASE_GRACE = 60 * 10
+
+# /metrics/ (формат Prometheus) открыт только с этих адресов. За
+# обратным прокси на том же хосте все запросы приходят с 127.0.0.1,
+# и одной проверки адреса мало: тогда задайте METRICS_TOKEN, и
+# сборщик должен слать заголовок «Authorization: Bearer <токен>»
+METRICS_IPS = ('127.0.0.1', '::1')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# как часто, в секундах, воркер кладет свою статистику в общий кэш
+METRICS_FLUSH_INTERVAL = 10
+
+# компилировать все шаблоны при старте и держать их в памяти;
+# при отладке шаблоны перечитываются с диска, чтобы правки были видны
+TEMPLATE_PRECOMPILE = not DEBUG
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'